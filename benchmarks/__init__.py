@@ -0,0 +1,2 @@
+# Description: benchmark suite for DirectedGraph and UndirectedGraph.
+# Run with: python -m benchmarks.run --help
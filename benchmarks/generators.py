@@ -0,0 +1,70 @@
+# Description: seeded synthetic graph generators for the benchmarks.
+# Every generator returns DirectedGraph style (src, dst, weight) edges over vertices 0..n-1,
+# to_undirected() turns them into UndirectedGraph style (u, v) name pairs.
+
+import random
+
+
+def erdos_renyi(n, m, seed=0) -> []:
+    """m edges picked uniformly at random (the G(n, m) model)"""
+    r = random.Random(seed)
+    return [(r.randrange(n), r.randrange(n), r.randint(1, 20)) for _ in range(m)]
+
+
+def grid(n, m=None, seed=0) -> []:
+    """square-ish grid with edges to the right and down neighbor, m is ignored"""
+    r = random.Random(seed)
+    cols = max(1, int(n ** 0.5))
+    edges = []
+    for v in range(n):
+        if (v + 1) % cols != 0 and v + 1 < n:
+            edges.append((v, v + 1, r.randint(1, 20)))
+        if v + cols < n:
+            edges.append((v, v + cols, r.randint(1, 20)))
+    return edges
+
+
+def power_law(n, m, seed=0) -> []:
+    """preferential attachment (Barabasi-Albert), every new vertex links to about m / n others"""
+    r = random.Random(seed)
+    per_vertex = max(1, m // max(n, 1))
+    targets = list(range(min(per_vertex, n)))
+    ends = []       # every edge end, picking from it favours high degree vertices
+    edges = []
+    for v in range(len(targets), n):
+        for t in set(targets):
+            edges.append((v, t, r.randint(1, 20)))
+            ends.extend((v, t))
+        targets = [r.choice(ends) for _ in range(per_vertex)]
+    return edges
+
+
+def dag(n, m, seed=0) -> []:
+    """m random edges that all point from a lower to a higher vertex, so there is no cycle"""
+    r = random.Random(seed)
+    edges = []
+    for _ in range(m):
+        u, v = r.randrange(n), r.randrange(n)
+        if u != v:
+            edges.append((min(u, v), max(u, v), r.randint(1, 20)))
+    return edges
+
+
+GENERATORS = {'erdos_renyi': erdos_renyi, 'grid': grid, 'power_law': power_law, 'dag': dag}
+
+
+def to_undirected(edges) -> []:
+    """vertex names for UndirectedGraph are strings"""
+    return [(f'v{u}', f'v{v}') for u, v, _ in edges]
+
+
+def random_walk(neighbors, start, length, seed=0) -> []:
+    """follows random edges from start, neighbors(v) lists the vertices reachable in one step"""
+    r = random.Random(seed)
+    path = [start]
+    for _ in range(length - 1):
+        options = neighbors(path[-1])
+        if len(options) == 0:
+            break
+        path.append(r.choice(options))
+    return path
@@ -0,0 +1,143 @@
+# Description: times every public query of DirectedGraph and UndirectedGraph on synthetic
+# graphs of growing size, records wall time and peak memory, and writes the results as JSON.
+# Passing --compare with an earlier result file flags methods that got slower.
+#
+#   python -m benchmarks.run --sizes 1000 10000 --out new.json --compare old.json
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from d_graph import DirectedGraph
+from ud_graph import UndirectedGraph
+
+from benchmarks.generators import GENERATORS, random_walk, to_undirected
+
+
+def measure(call, repeat):
+    """returns (best wall time in seconds, peak traced memory in bytes) of call()"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()     # separate run, tracing slows the call down
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def directed_cases(edges, storage):
+    """(method name, call) pairs for DirectedGraph"""
+    graph = DirectedGraph(edges, storage=storage)
+    path = random_walk(lambda v: [d for d, _ in graph.get_neighbors(v)], 0, 100)
+    return [
+        ('construction', lambda: DirectedGraph(edges, storage=storage)),
+        ('get_edges', graph.get_edges),
+        ('is_valid_path', lambda: graph.is_valid_path(path)),
+        ('dfs', lambda: graph.dfs(0)),
+        ('bfs', lambda: graph.bfs(0)),
+        ('bfs_levels', lambda: graph.bfs_levels(0)),
+        ('has_cycle', graph.has_cycle),
+        ('dijkstra', lambda: graph.dijkstra(0)),
+    ]
+
+
+def undirected_cases(edges, storage):
+    """(method name, call) pairs for UndirectedGraph"""
+    graph = UndirectedGraph(edges, storage=storage)
+    start = edges[0][0] if len(edges) > 0 else None
+    path = random_walk(lambda v: list(graph.adj_list[v]), start, 100) if start is not None else []
+
+    def components():
+        graph.components_stale = True   # measure a full count, not the cached union-find
+        return graph.count_connected_components()
+
+    return [
+        ('construction', lambda: UndirectedGraph(edges, storage=storage)),
+        ('get_edges', graph.get_edges),
+        ('is_valid_path', lambda: graph.is_valid_path(path)),
+        ('dfs', lambda: graph.dfs(start)),
+        ('bfs', lambda: graph.bfs(start)),
+        ('bfs_levels', lambda: graph.bfs_levels(start)),
+        ('has_cycle', graph.has_cycle),
+        ('count_connected_components', components),
+    ]
+
+
+def run(sizes, degree, generators, repeat, directed_storage, undirected_storage, seed=0) -> []:
+    results = []
+    for name in generators:
+        for n in sizes:
+            edges = GENERATORS[name](n, n * degree, seed)
+            for kind, storage, cases in (
+                    ('directed', directed_storage, directed_cases(edges, directed_storage)),
+                    ('undirected', undirected_storage, undirected_cases(to_undirected(edges), undirected_storage))):
+                for method, call in cases:
+                    result = {'graph': kind, 'storage': storage, 'generator': name, 'v': n, 'degree': degree,
+                              'e': len(edges), 'method': method}
+                    seconds, peak = measure(call, repeat)
+                    result.update(seconds=seconds, peak_bytes=peak)
+                    results.append(result)
+                    print(f'{kind:10} {name:12} V={n:<8} E={len(edges):<9} {method:27} '
+                          f'{seconds * 1000:10.2f} ms {peak / 1024:10.0f} KiB', flush=True)
+    return results
+
+
+def result_key(result):
+    # runs with other storage modes or degrees are different cases, never compared
+    return (result['graph'], result.get('storage'), result['generator'], result['v'], result.get('degree'),
+            result['method'])
+
+
+def compare(old, new, threshold, floor) -> []:
+    """returns (key, old seconds, new seconds) for every result more than threshold times slower"""
+    previous = {result_key(r): r['seconds'] for r in old if 'seconds' in r}
+    slower = []
+    for r in new:
+        if 'seconds' not in r:
+            continue
+        before = previous.get(result_key(r))
+        if before is not None and r['seconds'] > floor and r['seconds'] > before * threshold:
+            slower.append((result_key(r), before, r['seconds']))
+    return slower
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='benchmark DirectedGraph and UndirectedGraph')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='vertex counts')
+    parser.add_argument('--degree', type=int, default=4, help='average edges per vertex')
+    parser.add_argument('--generators', nargs='+', default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case, the best one counts')
+    parser.add_argument('--directed-storage', default='sparse')
+    parser.add_argument('--undirected-storage', default='list')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write results to this JSON file')
+    parser.add_argument('--compare', help='earlier JSON results to check for regressions')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio that counts as a regression')
+    parser.add_argument('--floor', type=float, default=0.001, help='ignore cases faster than this many seconds')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.degree, args.generators, args.repeat,
+                  args.directed_storage, args.undirected_storage, args.seed)
+    report = {'python': sys.version, 'platform': platform.platform(), 'args': vars(args), 'results': results}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)['results']
+        slower = compare(old, results, args.threshold, args.floor)
+        for key, before, after in slower:
+            print(f'REGRESSION {" ".join(map(str, key))}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms')
+        if len(slower) > 0:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
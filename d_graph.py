@@ -4,6 +4,25 @@
 # Description: implementation of a directed graph. First 50 lines are skeleton code provided to me in the assignment.
 # the rest has been coded by me.
 
+import heapq
+import os
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+from graph_file import DIRECTED, edge_chunks, integral, load_csr, load_landmarks, save_csr, save_landmarks
+from graph_stats import begin, finish
+from level_bfs import level_bfs, level_bfs_lists, reverse_arrays
+from query_cache import QueryCache, cached
+
+try:
+    import numpy as np
+except ImportError:     # numpy is only needed for storage='numpy'
+    np = None
+
 class DirectedGraph:
     """
     Class to implement directed weighted graph
@@ -11,50 +30,153 @@ class DirectedGraph:
     - loops not allowed
     - only positive edge weights
     - vertex names are integers
+    - remove_vertex() leaves a gap in the ids that every query treats as absent,
+      add_vertex() fills the smallest gap first (next_vertex() tells which id it
+      will use) and compact() closes the gaps by renumbering
     """
+    # every attribute is declared, graphs carry no per instance __dict__
+    __slots__ = ('storage', 'v_count', 'adj_matrix', 'adj_list', 'csr', 'compact_code', 'version',
+                 'cache', 'probe', 'topo_tracking', 'topo_reject', 'topo_valid', 'topo_order',
+                 'topo_position', 'landmarks', 'frozen', 'shared_rows', 'reachability',
+                 'level_csr', 'edge_index', 'in_neighbors', 'removed', 'free_ids')
 
-    def __init__(self, start_edges=None):
+    def __init__(self, start_edges=None, storage='dense'):
         """
         Store graph info as adjacency matrix
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        storage='sparse' keeps one {dst: weight} dict per vertex instead,
+        so memory and time stay O(V+E) for large graphs with few edges
+        storage='numpy' keeps the adjacency matrix in a numpy ndarray
+        storage='compact' keeps every matrix row in a typed array, 4 byte unsigned
+        ints while all weights are integers below 2**32 and doubles after that
+        (graphs returned by load() use read only storage='csr' until they are changed)
         """
+        if storage not in ('dense', 'sparse', 'numpy', 'compact'):
+            raise ValueError(f'unknown storage mode: {storage!r}')
+        if storage == 'numpy' and np is None:
+            raise ImportError("storage='numpy' requires numpy")
+        self.storage = storage
         self.v_count = 0
-        self.adj_matrix = []
+        self.adj_matrix = np.zeros((0, 0), dtype=np.int64) if storage == 'numpy' else []
+        self.adj_list = []
+        self.csr = None     # (offsets, targets, weights) for storage='csr'
+        self.compact_code = 'I'     # array typecode of the rows for storage='compact'
+        self.version = 0    # bumped by every mutating method
+        self.cache = None   # QueryCache, see enable_cache()
+        self.probe = None   # instrumentation sink, see instrument()
+        self.topo_tracking = False      # see track_topological_order()
+        self.topo_reject = False
+        self.topo_valid = False
+        self.topo_order = []
+        self.topo_position = []
+        self.landmarks = None   # LandmarkIndex, see build_landmarks()
+        self.frozen = False     # snapshots and frozen copies can't be changed
+        self.shared_rows = set()    # rows still shared with a snapshot, copied before a write
+        self.reachability = None    # ReachabilityIndex, see build_reachability()
+        self.level_csr = None   # [version, offsets, targets, reverse] kept for bfs_levels()
+        self.edge_index = None  # [version, sorted src * v_count + dst keys, weights] for validate_paths()
+        self.in_neighbors = None    # set of sources per vertex, built by the first remove_vertex()
+        self.removed = set()    # ids of removed vertices, reused by add_vertex() until compact()
+        self.free_ids = []      # the same ids as a heap, smallest first
 
         # populate graph with initial vertices and edges (if provided)
-        # before using, implement add_vertex() and add_edge() methods
+        # storage is sized once and the edges are written in a single pass
         if start_edges is not None:
             v_count = 0
             for u, v, _ in start_edges:
                 v_count = max(v_count, u, v)
-            for _ in range(v_count + 1):
-                self.add_vertex()
-            for u, v, weight in start_edges:
-                self.add_edge(u, v, weight)
+            self.add_vertices(v_count + 1)
+            self.insert_edges(start_edges)
+
+    @classmethod
+    def from_edges(cls, edges, storage='dense', v_count=None):
+        """
+        builds a graph from (src, dst, weight) tuples, any iterable works
+        gives the same graph as DirectedGraph(edges) unless v_count asks for more vertices
+        """
+        if not isinstance(edges, (list, tuple)):
+            edges = list(edges)     # need two passes, one to size storage and one to fill it
+        graph = cls(edges, storage)
+        if v_count is not None and v_count > graph.v_count:
+            graph.add_vertices(v_count - graph.v_count)
+        return graph
+
+    @classmethod
+    def from_arrays(cls, src, dst, weight=None, storage='dense', v_count=None):
+        """
+        builds a graph from parallel src/dst/weight sequences or numpy arrays
+        """
+        graph = cls(storage=storage)
+        n = 0
+        if len(src) > 0 and np is not None:
+            n = int(max(np.max(src), np.max(dst))) + 1
+        elif len(src) > 0:
+            n = max(max(src), max(dst)) + 1
+        if v_count is not None:
+            n = max(n, v_count)
+        graph.add_vertices(n)
+        graph.add_edges(src, dst, weight)
+        return graph
 
     def __str__(self):
         """
         Return content of the graph in human-readable form
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
-        if self.v_count == 0:
+        vertices = self.get_vertices()      # removed ids are left out
+        if len(vertices) == 0:
             return 'EMPTY GRAPH\n'
         out = '   |'
-        out += ' '.join(['{:2}'.format(i) for i in range(self.v_count)]) + '\n'
-        out += '-' * (self.v_count * 3 + 3) + '\n'
-        for i in range(self.v_count):
-            row = self.adj_matrix[i]
+        out += ' '.join(['{:2}'.format(i) for i in vertices]) + '\n'
+        out += '-' * (len(vertices) * 3 + 3) + '\n'
+        for i in vertices:
+            row = self.get_row(i)
+            if len(vertices) < self.v_count:
+                row = [row[j] for j in vertices]
             out += '{:2} |'.format(i)
             out += ' '.join(['{:2}'.format(w) for w in row]) + '\n'
-        out = f"GRAPH ({self.v_count} vertices):\n{out}"
+        out = f"GRAPH ({len(vertices)} vertices):\n{out}"
         return out
 
     # ------------------------------------------------------------------ #
 
+    def enable_cache(self, maxsize=128) -> None:
+        """
+        memoizes dfs, bfs, has_cycle, dijkstra and shortest_path results until the graph changes
+        """
+        self.cache = QueryCache(maxsize)
+
+    def disable_cache(self) -> None:
+        """
+        turns query caching off and drops the stored results
+        """
+        self.cache = None
+
+    def instrument(self, sink) -> None:
+        """
+        sink(stats) is called with a graph_stats.CallStats after every dfs, bfs,
+        has_cycle and dijkstra call (e.g. a graph_stats.StatsCollector), None turns it off
+        """
+        self.probe = sink
+
+    def cache_info(self) -> dict:
+        """
+        returns hit/miss statistics of the query cache, None when caching is off
+        """
+        return self.cache.info() if self.cache is not None else None
+
     def add_vertex(self) -> int:
         """
-        adds a vertex to the directed graph
+        adds a vertex to the directed graph, reusing the smallest removed id if there is one
+        (see next_vertex()), returns the number of vertices
         """
+        self.version += 1
+        self.thaw()
+        if len(self.free_ids) > 0:
+            v = heapq.heappop(self.free_ids)    # its row and column were cleared by remove_vertex
+            self.removed.discard(v)
+            return self.v_count - len(self.removed)
+        if self.storage != 'dense' or self.topo_tracking:
+            return self.add_vertices(1)
+        self.unshare()
         v = []
         self.adj_matrix.append(v)
         for vertex in self.adj_matrix:
@@ -62,6 +184,55 @@ class DirectedGraph:
         for vertex in range(self.v_count):
             v.append(0)
         self.v_count += 1
+        if self.reachability is not None:
+            self.reachability.grow(self.v_count)
+        if self.in_neighbors is not None:
+            self.in_neighbors.append(set())
+        return self.v_count
+
+    def next_vertex(self) -> int:
+        """
+        returns the id the next add_vertex() call gives the new vertex
+        """
+        return self.free_ids[0] if len(self.free_ids) > 0 else self.v_count
+
+    def has_vertex(self, v) -> bool:
+        """
+        returns True if v is the id of a vertex that was not removed
+        """
+        return v in range(self.v_count) and v not in self.removed
+
+    def add_vertices(self, count: int) -> int:
+        """
+        adds count vertices with ids v_count to v_count + count - 1, resizing storage only once
+        """
+        self.version += 1
+        self.thaw()
+        if self.storage == 'numpy':
+            self.adj_matrix = np.pad(self.adj_matrix, ((0, count), (0, count)))
+        elif self.storage == 'sparse':
+            self.adj_list.extend({} for _ in range(count))
+        elif self.storage == 'compact':
+            self.unshare()
+            size = array(self.compact_code).itemsize
+            for row in self.adj_matrix:
+                row.frombytes(bytes(size * count))  # zeroed columns straight into the buffer
+            for _ in range(count):
+                self.adj_matrix.append(array(self.compact_code, bytes(size * (self.v_count + count))))
+        else:
+            self.unshare()
+            for row in self.adj_matrix:
+                row.extend([0] * count)     # new columns for the existing rows
+            for _ in range(count):
+                self.adj_matrix.append([0] * (self.v_count + count))
+        if self.topo_tracking:
+            self.topo_position.extend(range(len(self.topo_order), len(self.topo_order) + count))
+            self.topo_order.extend(range(self.v_count, self.v_count + count))  # new vertices go last
+        self.v_count += count
+        if self.reachability is not None:
+            self.reachability.grow(self.v_count)
+        if self.in_neighbors is not None:
+            self.in_neighbors.extend(set() for _ in range(count))
         return self.v_count
 
 
@@ -69,193 +240,1372 @@ class DirectedGraph:
         """
         adds an edge between vertices in a directed graph
         """
+        self.version += 1
         if weight < 1:
             return
         if src == dst:
             return
         if src not in range(self.v_count) or dst not in range(self.v_count):
             return
-        self.adj_matrix[src][dst] = weight
+        if len(self.removed) > 0 and (src in self.removed or dst in self.removed):
+            return
+        self.thaw()
+        if self.topo_tracking and self.topo_valid and self.topo_position[src] > self.topo_position[dst]:
+            if not self.topo_update(src, dst):      # the edge closes a cycle
+                if self.topo_reject:
+                    return
+                self.topo_valid = False
+        if self.storage == 'sparse':
+            self.writable_row(src)[dst] = weight
+        elif self.storage == 'numpy':
+            if self.adj_matrix.dtype.kind == 'i' and not float(weight).is_integer():     # inf included
+                self.adj_matrix = self.adj_matrix.astype(np.float64)    # switch to float weights
+            self.adj_matrix[src, dst] = weight
+        else:
+            if self.storage == 'compact' and self.compact_code == 'I':
+                if compact_int(weight):
+                    weight = int(weight)    # 2.0 fits the row, but array('I') only takes ints
+                else:
+                    self.widen()
+            self.writable_row(src)[dst] = weight
+        self.edge_added(src, dst)
 
 
     def remove_edge(self, src: int, dst: int) -> None:
         """
         removes an edge from the directed graph
         """
+        self.version += 1
         if src not in range(self.v_count) or dst not in range(self.v_count):
             return
-        self.adj_matrix[src][dst] = 0
+        self.thaw()
+        if self.storage == 'sparse':
+            self.writable_row(src).pop(dst, None)
+        elif self.storage == 'numpy':
+            self.adj_matrix[src][dst] = 0
+        else:
+            self.writable_row(src)[dst] = 0
+        self.edge_removed(src, dst)
+
+    def edge_added(self, src: int, dst: int) -> None:
+        """updates the reachability and in-neighbor indexes after an edge was written"""
+        if self.reachability is not None:
+            self.reachability.insert(src, dst)
+        if self.in_neighbors is not None:
+            self.in_neighbors[dst].add(src)
+
+    def edge_removed(self, src: int, dst: int) -> None:
+        """updates the reachability and in-neighbor indexes after an edge was cleared"""
+        if self.reachability is not None:
+            self.reachability.stale = True     # removals can't be undone bit by bit, rebuild on next query
+        if self.in_neighbors is not None:
+            self.in_neighbors[dst].discard(src)
+
+    def add_edges(self, src, dst, weight=None) -> None:
+        """
+        adds a batch of edges given as parallel src/dst/weight sequences,
+        invalid edges are skipped the same way add_edge skips them
+        """
+        self.version += 1
+        self.thaw()
+        if weight is None:
+            weight = [1] * len(src)
+        if self.storage != 'numpy' or self.topo_tracking:
+            # numpy arrays are turned into lists so rows hold plain python numbers
+            src, dst, weight = (a.tolist() if hasattr(a, 'tolist') else a for a in (src, dst, weight))
+            self.insert_edges(zip(src, dst, weight))
+            return
+        src, dst, weight = np.asarray(src), np.asarray(dst), np.asarray(weight)
+        keep = (weight >= 1) & (src != dst) & (src >= 0) & (src < self.v_count) & (dst >= 0) & (dst < self.v_count)
+        if len(self.removed) > 0:
+            removed = list(self.removed)
+            keep &= ~np.isin(src, removed) & ~np.isin(dst, removed)
+        src, dst, weight = src[keep], dst[keep], weight[keep]
+        if weight.dtype.kind == 'f' and self.adj_matrix.dtype.kind == 'i':
+            self.adj_matrix = self.adj_matrix.astype(np.float64)
+        # keep only the last weight given for a repeated edge, like repeated add_edge calls
+        flat = src * self.v_count + dst
+        _, last = np.unique(flat[::-1], return_index=True)
+        last = len(flat) - 1 - last
+        self.adj_matrix[src[last], dst[last]] = weight[last]
+        if self.reachability is not None or self.in_neighbors is not None:
+            for u, v in zip(src.tolist(), dst.tolist()):
+                self.edge_added(u, v)
+
+    def insert_edges(self, edges) -> None:
+        """
+        adds (src, dst, weight) tuples in one pass, skipping invalid edges like add_edge
+        a repeated edge keeps the last weight given
+        """
+        self.version += 1
+        self.thaw()
+        if self.topo_tracking:
+            for u, v, weight in edges:
+                self.add_edge(u, v, weight)     # every edge has to be checked against the order
+            return
+        if self.storage == 'numpy':
+            edges = list(edges)
+            if len(edges) > 0:
+                self.add_edges(*zip(*edges))
+            return
+        if len(self.removed) > 0:
+            edges = [(u, v, w) for u, v, w in edges if u not in self.removed and v not in self.removed]
+        if self.storage == 'compact' and self.compact_code == 'I':
+            edges = list(edges)
+            if not all(compact_int(weight) for _, _, weight in edges if weight >= 1):
+                self.widen()
+            else:
+                edges = [(u, v, int(weight)) for u, v, weight in edges if weight >= 1]
+        n = self.v_count
+        rows = self.adj_list if self.storage == 'sparse' else self.adj_matrix
+        shared = self.shared_rows
+        indexed = self.reachability is not None or self.in_neighbors is not None
+        for u, v, weight in edges:
+            if weight >= 1 and u != v and 0 <= u < n and 0 <= v < n:
+                if u in shared:
+                    self.writable_row(u)
+                rows[u][v] = weight     # row is a list or a dict, both index the same way
+                if indexed:
+                    self.edge_added(u, v)
+
+    def ingest(self, source, chunk_size=100000, progress=None, delimiter=None, header=False) -> int:
+        """
+        streams edges into the graph chunk by chunk, source is a path to an edge list
+        ("src dst [weight]" per line) or csv file, an open file or an iterable of
+        (src, dst, weight) tuples, vertices are added as needed
+        progress(edges_read) is called after every chunk, returns the number of edges read
+        """
+        total = 0
+        for chunk in edge_chunks(source, parse_edge, chunk_size, delimiter, header):
+            high = max(max(u, v) for u, v, _ in chunk)
+            if high >= self.v_count:
+                self.add_vertices(high + 1 - self.v_count)     # grow once per chunk
+            self.insert_edges(chunk)
+            total += len(chunk)
+            if progress is not None:
+                progress(total)
+        return total
+
+    def remove_edges(self, src, dst) -> None:
+        """
+        removes a batch of edges given as parallel src/dst sequences
+        """
+        self.version += 1
+        self.thaw()
+        if self.storage != 'numpy':
+            for u, v in zip(src, dst):
+                self.remove_edge(u, v)
+            return
+        src, dst = np.asarray(src), np.asarray(dst)
+        keep = (src >= 0) & (src < self.v_count) & (dst >= 0) & (dst < self.v_count)
+        self.adj_matrix[src[keep], dst[keep]] = 0
+        if self.reachability is not None or self.in_neighbors is not None:
+            for u, v in zip(src[keep].tolist(), dst[keep].tolist()):
+                self.edge_removed(u, v)
+
+    def build_in_neighbors(self) -> None:
+        """
+        builds the index of incoming edges, kept up to date by every mutating method afterwards
+        """
+        self.in_neighbors = [set() for _ in range(self.v_count)]
+        for src in range(self.v_count):
+            for dst, _ in self.get_neighbors(src):
+                self.in_neighbors[dst].add(src)
+
+    def remove_vertex(self, v: int) -> None:
+        """
+        removes v with all edges into and out of it, O(degree) with sparse storage once
+        the in-neighbor index exists (the first call builds it), matrix rows add O(V)
+        the id stays in range as an isolated vertex that get_vertices() leaves out and
+        add_vertex() reuses, compact() renumbers the vertices and shrinks storage
+        """
+        self.version += 1
+        if v not in range(self.v_count) or v in self.removed:
+            return
+        self.thaw()
+        if self.in_neighbors is None:
+            self.build_in_neighbors()
+        for src in self.in_neighbors[v]:
+            if self.storage == 'sparse':
+                self.writable_row(src).pop(v, None)
+            elif self.storage == 'numpy':
+                self.adj_matrix[src, v] = 0
+            else:
+                self.writable_row(src)[v] = 0
+        for dst, _ in self.get_neighbors(v):
+            self.in_neighbors[dst].discard(v)
+        if self.storage == 'sparse':
+            self.adj_list[v] = {}
+        elif self.storage == 'numpy':
+            self.adj_matrix[v] = 0
+        elif self.storage == 'compact':
+            self.adj_matrix[v] = array(self.compact_code, bytes(array(self.compact_code).itemsize * self.v_count))
+        else:
+            self.adj_matrix[v] = [0] * self.v_count
+        self.shared_rows.discard(v)     # row v is a new object now
+        self.in_neighbors[v] = set()
+        self.removed.add(v)
+        heapq.heappush(self.free_ids, v)
+        if self.reachability is not None:
+            self.reachability.stale = True
+
+    def compact(self) -> dict:
+        """
+        renumbers the vertices 0, 1, ... in their current order, dropping removed ids,
+        shrinks storage to match and returns the {old id: new id} mapping
+        """
+        self.version += 1
+        self.thaw()
+        keep = self.get_vertices()
+        mapping = {old: new for new, old in enumerate(keep)}
+        if len(self.removed) == 0:
+            return mapping      # nothing to drop, ids stay the same
+        if self.storage == 'numpy':
+            self.adj_matrix = self.adj_matrix[np.ix_(keep, keep)]
+        elif self.storage == 'sparse':
+            self.adj_list = [{mapping[dst]: w for dst, w in self.adj_list[v].items()} for v in keep]
+        elif self.storage == 'compact':
+            self.adj_matrix = [array(self.compact_code, (self.adj_matrix[v][d] for d in keep)) for v in keep]
+        else:
+            self.adj_matrix = [[self.adj_matrix[v][d] for d in keep] for v in keep]
+        self.v_count = len(keep)
+        self.shared_rows = set()    # every row was rebuilt
+        self.removed = set()
+        self.free_ids = []
+        if self.in_neighbors is not None:
+            self.in_neighbors = [{mapping[u] for u in self.in_neighbors[v]} for v in keep]
+        if self.topo_tracking:
+            valid = self.topo_valid
+            self.set_topo_order([mapping[v] for v in self.topo_order if v in mapping])
+            self.topo_valid = valid
+        if self.reachability is not None:
+            self.reachability.stale = True
+        return mapping
+
+
+    def get_weight(self, src: int, dst: int):
+        """
+        returns the weight of edge src -> dst, 0 if there is no edge
+        """
+        if self.storage == 'sparse':
+            return self.adj_list[src].get(dst, 0)
+        if self.storage == 'csr':
+            offsets, targets, weights = self.csr
+            i = bisect_left(targets, dst, offsets[src], offsets[src + 1])    # targets of a row are sorted
+            return weights[i] if i < offsets[src + 1] and targets[i] == dst else 0
+        if self.storage == 'numpy':
+            return self.adj_matrix[src, dst].item()
+        return self.adj_matrix[src][dst]
 
+    def get_neighbors(self, v: int) -> []:
+        """
+        returns (dst, weight) pairs for every outgoing edge of v
+        """
+        if self.storage == 'sparse':
+            return list(self.adj_list[v].items())
+        if self.storage == 'csr':
+            offsets, targets, weights = self.csr
+            start, end = offsets[v], offsets[v + 1]
+            return list(zip(targets[start:end].tolist(), weights[start:end].tolist()))
+        if self.storage == 'numpy':
+            row = self.adj_matrix[v]
+            dst = np.flatnonzero(row)
+            return list(zip(dst.tolist(), row[dst].tolist()))
+        if self.storage == 'compact' and np is not None:
+            row = np.frombuffer(self.adj_matrix[v], dtype=self.compact_code)     # a view, nothing is copied
+            dst = np.flatnonzero(row)
+            return list(zip(dst.tolist(), row[dst].tolist()))
+        return [(dst, w) for dst, w in enumerate(self.adj_matrix[v]) if w != 0]
+
+    def get_row(self, v: int) -> []:
+        """
+        returns row v of the adjacency matrix (0 where there is no edge)
+        """
+        if self.storage in ('numpy', 'compact'):
+            return self.adj_matrix[v].tolist()
+        if self.storage != 'dense':
+            row = [0] * self.v_count
+            for dst, w in self.get_neighbors(v):
+                row[dst] = w
+            return row
+        return self.adj_matrix[v]
 
     def get_vertices(self) -> []:
         """
         returns all the vertices in the graph
         """
-        all = []
-        start = 0
-        for v in self.adj_matrix:
-            all.append(start)
-            start += 1
-        return all
+        if len(self.removed) > 0:
+            return [v for v in range(self.v_count) if v not in self.removed]
+        return list(range(self.v_count))
 
     def get_edges(self) -> []:
         """
         returns all the edges in the graph
         """
+        if self.storage == 'numpy':
+            src, dst = np.nonzero(self.adj_matrix > 0)    # row major, same order as the loop below
+            weight = self.adj_matrix[src, dst]
+            return list(zip(src.tolist(), dst.tolist(), weight.tolist()))
         all = []
-        src = 0
-        for v in self.adj_matrix:
-            dst = 0
-            for e in v:
+        for src in range(self.v_count):
+            for dst, e in sorted(self.get_neighbors(src)):
                 if e > 0:
                     all.append((src, dst, e))
-                dst += 1
-            src += 1
         return all
 
+    def to_csr(self):
+        """
+        returns the graph in compressed sparse row form as (offsets, targets, weights)
+        arrays, the edges of v are targets/weights[offsets[v]:offsets[v + 1]]
+        """
+        if self.storage == 'csr':
+            return self.csr
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = array('d')
+        for v in range(self.v_count):
+            for dst, w in sorted(self.get_neighbors(v)):
+                targets.append(dst)
+                weights.append(w)
+            offsets.append(len(targets))
+        return offsets, targets, weights
+
+    def thaw(self) -> None:
+        """
+        switches a read only csr graph to sparse storage so it can be changed
+        raises TypeError for snapshots and frozen copies, which stay read only
+        """
+        if self.frozen:
+            raise TypeError('graph is a read only snapshot, change the graph it was taken from')
+        if self.storage != 'csr':
+            return
+        offsets, targets, weights = self.csr
+        self.adj_list = []
+        for v in range(self.v_count):
+            start, end = offsets[v], offsets[v + 1]
+            self.adj_list.append(dict(zip(targets[start:end].tolist(), weights[start:end].tolist())))
+        self.storage = 'sparse'
+        self.csr = None
+
+    def writable_row(self, v: int):
+        """
+        returns row v of a dense or sparse graph for writing,
+        copying it first if a snapshot still shares it
+        """
+        rows = self.adj_list if self.storage == 'sparse' else self.adj_matrix
+        if v in self.shared_rows:
+            self.shared_rows.discard(v)
+            rows[v] = rows[v].copy() if self.storage == 'sparse' else rows[v][:]
+        return rows[v]
+
+    def widen(self) -> None:
+        """
+        switches the rows of a compact graph to doubles, for weights that don't fit 'I'
+        """
+        self.compact_code = 'd'
+        self.adj_matrix = [array('d', row) for row in self.adj_matrix]
+        self.shared_rows = set()    # every row is a new array now
+
+    def unshare(self) -> None:
+        """
+        copies every row still shared with a snapshot, before writes that touch all rows
+        """
+        for v in list(self.shared_rows):
+            self.writable_row(v)
+
+    def snapshot(self):
+        """
+        returns a read only copy of the graph as it is now, made in O(V):
+        rows are shared with the snapshot and this graph copies a row before changing it
+        queries on the snapshot can run in other threads while this graph keeps changing,
+        but snapshot() itself has to be called by the thread that changes the graph
+        """
+        graph = type(self)(storage='sparse')
+        graph.storage = self.storage
+        graph.v_count = self.v_count
+        graph.version = self.version
+        graph.csr = self.csr        # csr arrays are never written, share them as they are
+        graph.compact_code = self.compact_code
+        graph.removed = set(self.removed)
+        if self.storage == 'numpy':
+            graph.adj_matrix = self.adj_matrix.copy()   # numpy writes go into the array itself
+        elif self.storage in ('dense', 'compact'):
+            graph.adj_matrix = list(self.adj_matrix)
+            self.shared_rows = set(range(self.v_count))
+        elif self.storage == 'sparse':
+            graph.adj_list = list(self.adj_list)
+            self.shared_rows = set(range(self.v_count))
+        graph.frozen = True
+        return graph
+
+    def freeze(self):
+        """
+        returns a read only copy of the graph in compact csr form, made in O(V+E)
+        shares nothing with this graph, for readers that keep a version for long
+        """
+        offsets, targets, weights = self.to_csr()
+        if self.storage != 'csr' and integral(weights):
+            weights = array('q', (int(w) for w in weights))     # keep integer weights as integers
+        graph = type(self)(storage='sparse')
+        graph.storage = 'csr'
+        graph.v_count = self.v_count
+        graph.version = self.version
+        graph.csr = (offsets, targets, weights)
+        graph.removed = set(self.removed)
+        graph.frozen = True
+        return graph
+
+    def save(self, path) -> None:
+        """
+        writes the graph to path in the compact binary format of graph_file.py
+        removed ids are written too, so load() leaves them out like this graph does
+        """
+        save_csr(path, DIRECTED, *self.to_csr(), removed=self.removed)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        reads a graph written by save(), with mmap=True the file is mapped read only
+        and shared with other processes instead of being copied into memory
+        the graph uses storage='csr' and switches to sparse storage when it is changed
+        """
+        sections = load_csr(path, DIRECTED, mmap)
+        graph = cls()
+        graph.storage = 'csr'
+        graph.v_count = sections['v_count']
+        graph.csr = (sections['offsets'], sections['targets'], sections['weights'])
+        graph.removed = set(sections['removed'])
+        graph.free_ids = sorted(graph.removed)     # a sorted list is already a heap
+        return graph
+
     def is_valid_path(self, path: []) -> bool:
         """
         checks if given path is valid
         """
-        index = 1
-        for v in path:
-            if v is not path[-1]:
-                if self.adj_matrix[v][path[index]] is None:
-                    return False
-                if self.adj_matrix[v][path[index]] < 1:
-                    return False
-                index += 1
-        return True
+        return self.check_path(path)[0] == -1
 
-    def dfs_helper(self, v_end, output, stack):
-        """recursive helper for bfs"""
-        if len(stack) > 0:      # if the stack is empty, return the output
-            v = stack.pop()
-            if v not in output:
-                output.append(v)    # add element popped from the stack to output
-                if v == v_end:
-                    return output
-                temp = []       # crete a temporary list to be sorted and added to the stack
-                for element in range(0, len(self.adj_matrix[v])):
-                    if self.adj_matrix[v][element] != 0:
-                        temp.append(element)
-                temp.sort(reverse=True)  # add the vertices to the stack so they are processed in lexicographical order
-                for vertex in temp:
-                    stack.append(vertex)
-            return self.dfs_helper(v_end, output, stack)
-        return output
+    def check_path(self, path: []):
+        """
+        returns (index of the first hop that is not an edge or -1, total weight of the path)
+        hop i goes from path[i] to path[i + 1]
+        """
+        if len(path) == 1 and path[0] in self.removed:
+            return 0, float('inf')      # hops to or from a removed vertex fail on their weight
+        total = 0
+        for i in range(len(path) - 1):      # hops are compared by position, vertices may repeat
+            src, dst = path[i], path[i + 1]
+            if src not in range(self.v_count) or dst not in range(self.v_count):
+                return i, float('inf')
+            weight = self.get_weight(src, dst)
+            if weight < 1:
+                return i, float('inf')
+            total += weight
+        return -1, total
+
+    def validate_paths(self, paths, weights=False, first_bad=False):
+        """
+        checks many paths in one pass, returns a boolean array of is_valid_path() results
+        weights=True adds each path's total weight (inf for invalid paths) and first_bad=True
+        the index of its first hop that is not an edge (-1 for valid paths), as (valid, ...)
+        the hops of all paths are looked up together with numpy, results are lists without it
+        """
+        paths = [list(path) for path in paths]
+        if np is None:
+            checks = [self.check_path(path) for path in paths]
+            result = [[bad == -1 for bad, _ in checks]]
+            if weights:
+                result.append([total for _, total in checks])
+            if first_bad:
+                result.append([bad for bad, _ in checks])
+            return result[0] if len(result) == 1 else tuple(result)
+        lengths = np.fromiter((len(path) for path in paths), dtype=np.int64, count=len(paths))
+        flat = np.fromiter(chain.from_iterable(paths), dtype=np.int64, count=int(lengths.sum()))
+        path_start = np.cumsum(lengths) - lengths
+        hops = np.maximum(lengths - 1, 0)
+        path_id = np.repeat(np.arange(len(paths)), hops)
+        hop = np.arange(len(path_id)) - np.repeat(np.cumsum(hops) - hops, hops)    # hop number inside its path
+        src = flat[path_start[path_id] + hop]
+        dst = flat[path_start[path_id] + hop + 1]
+        n = self.v_count
+        inside = (src >= 0) & (src < n) & (dst >= 0) & (dst < n)
+        hop_weight = np.zeros(len(src))
+        src, dst = src[inside], dst[inside]
+        if self.storage == 'numpy':
+            hop_weight[inside] = self.adj_matrix[src, dst]      # gather straight from the matrix
+        else:
+            if self.edge_index is None or self.edge_index[0] != self.version:
+                offsets, targets, edge_weights = self.to_csr()
+                # rows and the targets within a row are sorted, so the keys come out sorted
+                keys = np.repeat(np.arange(n), np.diff(np.asarray(offsets))) * n + np.asarray(targets)
+                self.edge_index = [self.version, keys, np.asarray(edge_weights, dtype=np.float64)]
+            _, keys, edge_weights = self.edge_index
+            wanted = src * n + dst
+            i = np.minimum(np.searchsorted(keys, wanted), max(len(keys) - 1, 0))
+            if len(keys) > 0:
+                hop_weight[inside] = np.where(keys[i] == wanted, edge_weights[i], 0)
+        bad = hop_weight < 1
+        first = np.full(len(paths), len(flat), dtype=np.int64)     # larger than any hop number
+        np.minimum.at(first, path_id[bad], hop[bad])
+        if len(self.removed) > 0:
+            alone = np.flatnonzero(lengths == 1)    # single vertex paths have no hop to fail
+            first[alone[np.isin(flat[path_start[alone]], list(self.removed))]] = 0
+        valid = first == len(flat)
+        first[valid] = -1
+        result = [valid]
+        if weights:
+            # float64 even when no path has a hop, bincount of an empty array gives int64
+            total = np.bincount(path_id, weights=hop_weight, minlength=len(paths)).astype(np.float64)
+            total[~valid] = np.inf
+            result.append(total)
+        if first_bad:
+            result.append(first)
+        return result[0] if len(result) == 1 else tuple(result)
 
+    def dfs_helper(self, v_end, stack):
+        """iterative helper for dfs, yields vertices as they are visited"""
+        sink = self.probe
+        stats = begin(sink, 'dfs')
+        if stats is not None:
+            stats.pushes = len(stack)
+        visited = set()
+        try:
+            while len(stack) > 0:       # stop once the stack is empty
+                v = stack.pop()
+                if stats is not None:
+                    stats.pops += 1
+                if v not in visited:
+                    visited.add(v)
+                    yield v     # element popped from the stack is the next one visited
+                    if v == v_end:
+                        return
+                    neighbors = self.get_neighbors(v)
+                    temp = [element for element, _ in neighbors if element not in visited]
+                    temp.sort(reverse=True)  # add the vertices to the stack so they are processed in lexicographical order
+                    stack.extend(temp)
+                    if stats is not None:
+                        stats.scan(len(neighbors), len(temp), len(stack))
+        finally:
+            if stats is not None:
+                stats.vertices_visited = len(visited)
+                finish(sink, stats)
+
+    def iter_dfs(self, v_start, v_end=None):
+        """
+        generator version of dfs, yields vertices lazily in the same order
+        """
+        if not self.has_vertex(v_start):
+            return
+        yield from self.dfs_helper(v_end, [v_start])
+
+    @cached
     def dfs(self, v_start, v_end=None) -> []:
         """
         depth first search for a directed graph
         """
-        output = []
-        stack = [v_start]  # add start to the stack
-        if v_start not in range(self.v_count):
-            return output
-        return self.dfs_helper(v_end, output, stack)  # call recursive helper
-
-    def bfs_helper(self, v_end, visited, queue):
-        """recursive helper for bfs"""
-        if len(queue) > 0:  # return visited if the queue is empty
-            v = queue.pop(0)  # dequeue
-            if v not in visited:
-                visited.append(v)  # add v to visited if v is not already in there
-                if v is v_end:
-                    return visited
-                temp = []  # create temp list to help add to queue in lexicographical order
-                for element in range(0, len(self.adj_matrix[v])):
-                    if self.adj_matrix[v][element] != 0:
-                        temp.append(element)
-                temp.sort()
-                for vertex in temp:
-                    queue.append(vertex)  # add all vertices to the queue in lexicographical order
-            return self.bfs_helper(v_end, visited, queue)
-        return visited
+        return list(self.iter_dfs(v_start, v_end))
+
+    def bfs_helper(self, v_end, queue):
+        """iterative helper for bfs, yields vertices as they are visited"""
+        sink = self.probe
+        stats = begin(sink, 'bfs')
+        if stats is not None:
+            stats.pushes = len(queue)
+        visited = set()
+        try:
+            while len(queue) > 0:   # stop once the queue is empty
+                v = queue.popleft()     # dequeue
+                if stats is not None:
+                    stats.pops += 1
+                if v not in visited:
+                    visited.add(v)
+                    yield v
+                    if v == v_end:
+                        return
+                    neighbors = self.get_neighbors(v)
+                    temp = [element for element, _ in neighbors if element not in visited]
+                    temp.sort()
+                    queue.extend(temp)  # add all vertices to the queue in lexicographical order
+                    if stats is not None:
+                        stats.scan(len(neighbors), len(temp), len(queue))
+        finally:
+            if stats is not None:
+                stats.vertices_visited = len(visited)
+                finish(sink, stats)
+
+    def iter_bfs(self, v_start, v_end=None):
+        """
+        generator version of bfs, yields vertices lazily in the same order
+        """
+        if not self.has_vertex(v_start):
+            return
+        yield from self.bfs_helper(v_end, deque([v_start]))
 
+    @cached
     def bfs(self, v_start, v_end=None) -> []:
         """
         Return list of vertices visited during BFS search
         """
-        visited = []
-        queue = [v_start]
-        if v_start not in range(self.v_count):
-            return visited
-        return self.bfs_helper(v_end, visited, queue)  # call recursive helper
-
-    def cycle_helper(self, v, tracker1, tracker2):
-        """recursive helper for has cycle method"""
-        tracker1[v] = True       # set true for the node we are visiting
-        tracker2[v] = True
-        for vertices in range(len(self.adj_matrix[v])):   # for all vertices adjacent to v
-            if self.adj_matrix[v][vertices] != 0:    # if there is a connection between vertices
-                if tracker1[vertices] is False:  # if vertex has not been visited
-                    if self.cycle_helper(vertices, tracker1, tracker2) is True:    # if cycle helper for adj vertex is true
-                        return True    # return true
-                elif tracker2[vertices] is True:
-                    return True
-        tracker2[v] = False
-        return False
+        return list(self.iter_bfs(v_start, v_end))
 
+    def bfs_levels(self, v_start, direction='auto'):
+        """
+        breadth first search one whole level at a time, returns (levels, parents) where
+        levels[v] is the number of edges from v_start to v and parents[v] the vertex before
+        v on such a path (-1 for vertices that can't be reached, parents[v_start] is v_start)
+        with numpy the results are int64 arrays and levels are expanded top-down or
+        bottom-up (direction='auto' picks whichever scans fewer edges), lists otherwise
+        """
+        if self.level_csr is None or self.level_csr[0] != self.version:
+            if self.storage == 'numpy':
+                rows, targets = np.nonzero(self.adj_matrix)     # row major, so already csr order
+                offsets = np.zeros(self.v_count + 1, dtype=np.int64)
+                np.cumsum(np.bincount(rows, minlength=self.v_count), out=offsets[1:])
+            else:
+                offsets, targets, _ = self.to_csr()
+                if np is not None:
+                    offsets, targets = np.asarray(offsets, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+            self.level_csr = [self.version, offsets, targets, None]
+        _, offsets, targets, reverse = self.level_csr
+        if v_start in self.removed:
+            v_start = -1        # nothing is reached, like any other id that isn't a vertex
+        if np is None:
+            return level_bfs_lists(offsets, targets, self.v_count, v_start, self.probe)
+        if reverse is None and direction != 'top-down':
+            reverse = self.level_csr[3] = reverse_arrays(offsets, targets, self.v_count)
+        return level_bfs(offsets, targets, self.v_count, v_start, reverse, direction, self.probe)
 
+    def cycle_helper(self, stats=None):
+        """
+        iterative depth first search for a back edge, returns the cycle it closes
+        as [v0, v1, ..., v0] or None if there is none, O(V+E)
+        """
+        state = [0] * self.v_count      # 0 not seen, 1 on the current dfs path, 2 finished
+        for root in range(self.v_count):
+            if state[root] != 0:
+                continue
+            state[root] = 1
+            path = [root]
+            work = [iter(self.get_neighbors(root))]     # edges left to scan for every vertex on path
+            if stats is not None:
+                stats.pushes += 1
+            while len(work) > 0:
+                for w, _ in work[-1]:
+                    if stats is not None:
+                        stats.edges_scanned += 1
+                    if state[w] == 1:       # back edge, w is on the path so path[w:] + w is a cycle
+                        return path[path.index(w):] + [w]
+                    if state[w] == 0:
+                        state[w] = 1
+                        path.append(w)
+                        work.append(iter(self.get_neighbors(w)))
+                        if stats is not None:
+                            stats.pushes += 1
+                            stats.peak_frontier = max(stats.peak_frontier, len(work))
+                        break
+                else:
+                    state[path.pop()] = 2
+                    work.pop()
+                    if stats is not None:
+                        stats.pops += 1
+                        stats.vertices_visited += 1
+        return None
+
+
+    @cached
     def has_cycle(self):
         """
         Return True if graph contains a cycle, False otherwise
         """
-        if len(self.adj_matrix) < 3:
-            return False    # return false if graph is too small for a cycle
-        tracker1 = {}
-        tracker2 = {}
-        for v in range(self.v_count):
-            tracker1[v] = False  # create a visited tracker1
-        for v in range(self.v_count):
-            tracker2[v] = False  # create a tracker2 for recursion
-        for v in range(self.v_count):
-            if tracker1[v] is False:
-                if self.cycle_helper(v, tracker1, tracker2) is True:   # call recursive helper
-                    return True
+        sink = self.probe
+        stats = begin(sink, 'has_cycle')
+        try:
+            if self.topo_tracking:
+                return self.topological_order() is None
+            return self.cycle_helper(stats) is not None
+        finally:
+            finish(sink, stats)
+
+    @cached
+    def find_cycle(self):
+        """
+        returns a directed cycle as the list of its vertices, first vertex repeated
+        at the end ([u, v, u] for u -> v -> u), None if the graph has no cycle
+        """
+        sink = self.probe
+        stats = begin(sink, 'find_cycle')
+        try:
+            return self.cycle_helper(stats)
+        finally:
+            finish(sink, stats)
+
+
+    def kahn_order(self):
+        """
+        returns a topological order of all vertices, None if the graph has a cycle
+        """
+        vertices = self.get_vertices()
+        in_degree = [0] * self.v_count
+        neighbors = [self.get_neighbors(v) for v in range(self.v_count)]
+        for v in vertices:
+            for dst, _ in neighbors[v]:
+                in_degree[dst] += 1
+        order = [v for v in vertices if in_degree[v] == 0]
+        for v in order:     # order grows while we walk it
+            for dst, _ in neighbors[v]:
+                in_degree[dst] -= 1
+                if in_degree[dst] == 0:
+                    order.append(dst)
+        if len(order) < len(vertices):
+            return None     # vertices on a cycle never reach in degree 0
+        return order
+
+    def track_topological_order(self, reject_cycles=False) -> None:
+        """
+        keeps a topological order up to date as edges are added, so has_cycle(),
+        would_create_cycle() and topological_order() no longer rescan the graph
+        with reject_cycles=True add_edge silently drops edges that would close a cycle
+        """
+        order = self.kahn_order()
+        if order is None and reject_cycles:
+            raise ValueError('graph already contains a cycle')
+        self.topo_tracking = True
+        self.topo_reject = reject_cycles
+        self.set_topo_order(order)
+
+    def set_topo_order(self, order) -> None:
+        """stores order (or marks it invalid when order is None)"""
+        self.topo_valid = order is not None
+        self.topo_order = order if order is not None else self.get_vertices()
+        # removed ids have no edges, they go last so add_vertex() can reuse them with a position
+        self.topo_order = self.topo_order + sorted(self.removed)
+        self.topo_position = [0] * self.v_count
+        for i, v in enumerate(self.topo_order):
+            self.topo_position[v] = i
+
+    def topo_helper(self, start, target, upper):
+        """
+        forward search from start over vertices placed at or before position upper
+        returns the set of vertices reached, None if target is reached (a cycle)
+        """
+        reached = {start}
+        stack = [start]
+        while len(stack) > 0:
+            v = stack.pop()
+            for w, _ in self.get_neighbors(v):
+                if w == target:
+                    return None
+                if w not in reached and self.topo_position[w] <= upper:
+                    reached.add(w)
+                    stack.append(w)
+        return reached
+
+    def topo_update(self, src, dst) -> bool:
+        """
+        repairs the order for a new edge src -> dst that points backwards in it
+        (one way search: everything reachable from dst inside the affected
+        window moves right after src), returns False if the edge closes a cycle
+        """
+        lower, upper = self.topo_position[dst], self.topo_position[src]
+        reached = self.topo_helper(dst, src, upper)
+        if reached is None:
+            return False
+        window = self.topo_order[lower:upper + 1]
+        window = [v for v in window if v not in reached] + [v for v in window if v in reached]
+        for i, v in enumerate(window, lower):
+            self.topo_order[i] = v
+            self.topo_position[v] = i
+        return True
+
+    def would_create_cycle(self, src: int, dst: int) -> bool:
+        """
+        returns True if adding the edge src -> dst would close a cycle
+        """
+        if not self.has_vertex(src) or not self.has_vertex(dst) or src == dst:
+            return False
+        if self.topo_tracking and self.topo_valid:
+            if self.topo_position[src] < self.topo_position[dst]:
+                return False    # edge agrees with the order, no search needed
+            return self.topo_helper(dst, src, self.topo_position[src]) is None
+        for v in self.iter_dfs(dst, src):
+            if v == src:
+                return True
         return False
 
+    def topological_order(self):
+        """
+        returns the vertices in topological order, None if the graph has a cycle
+        """
+        if not self.topo_tracking:
+            return self.kahn_order()
+        if not self.topo_valid:
+            self.set_topo_order(self.kahn_order())  # edges were removed since the cycle was added
+            if not self.topo_valid:
+                return None
+        if len(self.removed) > 0:
+            return [v for v in self.topo_order if v not in self.removed]
+        return list(self.topo_order)
+
+
+    def strongly_connected_components(self) -> []:
+        """
+        returns the strongly connected components as lists of vertices, using an
+        iterative version of Tarjan's algorithm so deep graphs don't hit the recursion limit
+        components come in reverse topological order: every edge between two components
+        points from a later component to an earlier one
+        """
+        sink = self.probe
+        stats = begin(sink, 'strongly_connected_components')
+        index = [-1] * self.v_count     # discovery number of every vertex, -1 if not seen yet
+        low = [0] * self.v_count        # lowest discovery number reachable through the dfs subtree
+        on_stack = [False] * self.v_count
+        stack = []
+        components = []
+        counter = 0
+        for root in range(self.v_count):
+            if index[root] != -1 or root in self.removed:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, iter(self.get_neighbors(root)))]    # explicit dfs stack of (vertex, edges left)
+            while len(work) > 0:
+                v, edges = work[-1]
+                for w, _ in edges:
+                    if stats is not None:
+                        stats.edges_scanned += 1
+                    if index[w] == -1:      # tree edge, descend into w
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append((w, iter(self.get_neighbors(w))))
+                        break
+                    if on_stack[w] and index[w] < low[v]:
+                        low[v] = index[w]
+                else:       # every edge of v is done
+                    work.pop()
+                    if stats is not None:
+                        stats.vertices_visited += 1
+                        stats.peak_frontier = max(stats.peak_frontier, len(work) + 1)
+                    if len(work) > 0 and low[v] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[v]
+                    if low[v] == index[v]:      # v is the root of a component
+                        component = []
+                        while True:
+                            w = stack.pop()
+                            on_stack[w] = False
+                            component.append(w)
+                            if w == v:
+                                break
+                        components.append(component)
+        finish(sink, stats)
+        return components
+
+    def condensation(self):
+        """
+        returns (components, component, dag): the components of strongly_connected_components(),
+        the component id of every vertex (-1 for removed ids) and the condensation, a sparse DirectedGraph with
+        one vertex per component and an edge c -> d weighted with the number of edges from
+        component c to component d (edges always go from a higher id to a lower one)
+        """
+        components = self.strongly_connected_components()
+        component = [-1] * self.v_count
+        for c, members in enumerate(components):
+            for v in members:
+                component[v] = c
+        dag = DirectedGraph(storage='sparse')
+        dag.add_vertices(len(components))
+        for v in self.get_vertices():
+            row = dag.adj_list[component[v]]
+            for w, _ in self.get_neighbors(v):
+                if component[w] != component[v]:
+                    row[component[w]] = row.get(component[w], 0) + 1
+        return components, component, dag
+
+    def build_reachability(self):
+        """
+        precomputes a ReachabilityIndex so reachable() is a single bit test,
+        the index is kept up to date as edges are added and rebuilt after removals
+        memory is one bit per pair of strongly connected components
+        """
+        self.reachability = ReachabilityIndex(self)
+        return self.reachability
+
+    def reachable(self, src: int, dst: int) -> bool:
+        """
+        returns True if there is a path from src to dst (every vertex reaches itself)
+        uses the reachability index, building it on the first call
+        """
+        if not self.has_vertex(src) or not self.has_vertex(dst):
+            return False
+        if self.reachability is None:
+            self.build_reachability()
+        elif self.reachability.stale:
+            self.reachability.rebuild(self)
+        return self.reachability.query(src, dst)
 
-    def dijkstra_helper(self, visited, priority_queue):
-        """helper function for dijkstra's algorithm"""
-        while len(priority_queue) > 0:      # while priority queue isnt empty
-            temp = priority_queue.pop(0)
-            v = temp[0]     # key is vertex v
-            d = temp[1]     # value is min distance d to vertex d
-            if visited[v] == float('inf'):     # if v is not in the map of visited vertices
-                visited[v] = d      # value = d
-                for v_i in range(len(self.adj_matrix[v])): # for each successor vi of v
-                    if self.adj_matrix[v][v_i] > 0:
-                        d_i = self.adj_matrix[v][v_i]   # let di be the cost/distance associated with edge (v, vi)
-                        insert = [v_i, d + d_i]        # insert vi into priority queue with distance d + di
-                        if len(priority_queue) == 0:
-                            priority_queue.append(insert) # if priority queue is empty, insert at index 0
-                        else:
-                            index = 0
-                            while insert not in priority_queue:   # while vi is not in priority queue
-                                if priority_queue[index][1] > insert[1]:    # if index value > insert value (vi)
-                                    priority_queue.insert(index, insert)    # insert vi into priority queue
-                                elif index == len(priority_queue) - 1:  # if end of que is reached
-                                    priority_queue.append(insert)   # insert vi into the end of the queue
-                                index += 1     # increment the index we are checking
-        return visited
-
-
-    def dijkstra(self, src: int) -> []:
+    def reachable_many(self, pairs) -> []:
+        """
+        returns reachable(src, dst) for every (src, dst) pair
+        """
+        pairs = list(pairs)
+        if self.reachability is None:
+            self.build_reachability()
+        elif self.reachability.stale:
+            self.reachability.rebuild(self)
+        component, reach = self.reachability.component, self.reachability.reach
+        n = self.v_count
+        removed = self.removed
+        return [0 <= u < n and 0 <= v < n and u not in removed and v not in removed and
+                (reach[component[u]] >> component[v]) & 1 == 1 for u, v in pairs]
+
+    def dijkstra_helper(self, distance, previous, heap, dst=None):
+        """helper function for dijkstra's algorithm using a binary heap"""
+        sink = self.probe
+        stats = begin(sink, 'dijkstra')
+        settled = [False] * self.v_count
+        initial = pushes = len(heap)
+        while len(heap) > 0:        # while priority queue isnt empty
+            d, v = heapq.heappop(heap)  # pop vertex v with the smallest distance d
+            if stats is not None:
+                stats.pops += 1
+            if settled[v]:
+                continue        # stale heap entry, v already has its final distance
+            settled[v] = True
+            if stats is not None:
+                stats.vertices_visited += 1
+            if v == dst:
+                break       # target is settled, the rest of the graph is not needed
+            neighbors = self.get_neighbors(v)
+            for v_i, d_i in neighbors:     # for each successor vi of v
+                if d_i > 0 and d + d_i < distance[v_i]:    # found a shorter way to vi
+                    distance[v_i] = d + d_i
+                    previous[v_i] = v
+                    heapq.heappush(heap, (d + d_i, v_i))   # lazy deletion, old entry is skipped later
+                    pushes += 1
+            if stats is not None:
+                stats.scan(len(neighbors), 0, len(heap))
+        if stats is not None:
+            stats.pushes = pushes
+            stats.edges_relaxed = pushes - initial  # every push after the starting ones is a relaxation
+            finish(sink, stats)
+        if dst is not None:
+            for v in range(self.v_count):
+                if not settled[v]:
+                    distance[v] = float('inf')     # only report distances that are final
+        return distance
+
+
+    @cached
+    def dijkstra(self, src: int, dst=None, predecessors=False) -> []:
         """
         implementation of Dijkstra's algorithm
+        if dst is given the search stops once dst is settled and vertices
+        that were not settled are reported as inf
+        if predecessors is True returns (distances, previous) where previous[v]
+        is the vertex before v on a shortest path from src (None if there is none)
         """
-        visited = {}    # track vertices already visited
-        for v in range(self.v_count):
-            visited[v] = float('inf')       # distance for all in visited are initialized to infinity
-        priority_queue = []
-        priority_queue.append([src, 0])     # add start to the priority queue
-        visited = self.dijkstra_helper(visited, priority_queue)    # visited is dijkstra output
-        output = []
-        for key in visited:
-            output.append(visited[key])     # create list for output
-        return output
+        distance = [float('inf')] * self.v_count   # distances are initialized to infinity
+        previous = [None] * self.v_count
+        if self.has_vertex(src):
+            distance[src] = 0
+            heap = [(0, src)]       # add start to the priority queue
+            self.dijkstra_helper(distance, previous, heap, dst)
+        if predecessors:
+            return distance, previous
+        return distance
+
+    @cached
+    def shortest_path(self, src: int, dst: int) -> []:
+        """
+        returns the vertices on a shortest path from src to dst, [] if there is none
+        """
+        if not self.has_vertex(src) or not self.has_vertex(dst):
+            return []
+        distance, previous = self.dijkstra(src, dst, predecessors=True)
+        if distance[dst] == float('inf'):
+            return []
+        path = [dst]
+        while path[-1] != src:
+            path.append(previous[path[-1]])     # walk back along the predecessor array
+        path.reverse()
+        return path
+
+    def all_pairs_shortest_paths(self):
+        """
+        returns the matrix of shortest distances between every pair of vertices
+        with storage='numpy' this is a vectorized Floyd-Warshall returning an ndarray,
+        otherwise it is a list with one dijkstra() row per source
+        """
+        if self.storage != 'numpy':
+            return [self.dijkstra(src) for src in range(self.v_count)]
+        dist = np.where(self.adj_matrix > 0, self.adj_matrix, np.inf).astype(np.float64)
+        np.fill_diagonal(dist, 0)
+        removed = list(self.removed)
+        dist[removed, removed] = np.inf     # removed ids reach nothing, not even themselves
+        for k in range(self.v_count):
+            # relax every pair through k at once: dist[i][j] = min(dist[i][j], dist[i][k] + dist[k][j])
+            np.minimum(dist, dist[:, k, None] + dist[None, k, :], out=dist)
+        return dist
+
+    def dijkstra_many(self, sources, workers=None):
+        """
+        runs dijkstra() for every source, fanned out over a pool of worker processes
+        the graph is shared with the workers once as a CSR snapshot in shared memory
+        and every worker writes its rows straight into one shared result block
+        returns a (len(sources), v_count) ndarray, or a list of rows without numpy
+        """
+        sources = list(sources)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(sources)))
+        offsets, targets, weights = self.to_csr()
+        csr = (offsets, targets, array('d', weights))     # workers read weights as doubles
+        v_count = self.v_count
+        # a removed source gets an all inf row like dijkstra() gives it, -1 is no vertex at all
+        sources = [-1 if src in self.removed else src for src in sources]
+        if workers == 1:
+            rows = [dijkstra_csr(*csr, v_count, src) for src in sources]
+            return np.array(rows, dtype=np.float64).reshape(len(sources), v_count) if np is not None else rows
+        # one block per CSR array plus the result block, never zero sized
+        sizes = [len(a) * a.itemsize for a in csr] + [len(sources) * v_count * 8]
+        blocks = [SharedMemory(create=True, size=max(size, 1)) for size in sizes]
+        try:
+            for block, a, size in zip(blocks, csr, sizes):
+                block.buf[:size] = a.tobytes()
+            tasks = list(enumerate(sources))
+            chunk = -(-len(tasks) // (workers * 4))     # a few chunks per worker to balance the load
+            names = [block.name for block in blocks]
+            with ProcessPoolExecutor(workers, initializer=dijkstra_worker_init,
+                                     initargs=(names, sizes, v_count)) as pool:
+                list(pool.map(dijkstra_worker, [tasks[i:i + chunk] for i in range(0, len(tasks), chunk)]))
+            result = blocks[3].buf[:sizes[3]].cast('d')
+            try:
+                if np is not None:
+                    return np.frombuffer(result, dtype=np.float64).reshape(len(sources), v_count).copy()
+                return [result[i * v_count:(i + 1) * v_count].tolist() for i in range(len(sources))]
+            finally:
+                result.release()
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def build_landmarks(self, k=8):
+        """
+        precomputes a LandmarkIndex with k landmarks for alt_query() and returns it
+        costs 2k dijkstra runs and 2k * v_count floats of memory
+        """
+        self.landmarks = LandmarkIndex.build(self, k)
+        return self.landmarks
+
+    def refresh_landmarks(self, k=None) -> None:
+        """
+        recomputes the landmark distances for the current graph,
+        k picks a new set of k landmarks
+        """
+        if self.landmarks is None:
+            raise ValueError('no landmark index, call build_landmarks() first')
+        self.landmarks.refresh(self, k)
+
+    def save_landmarks(self, path) -> None:
+        """
+        writes the landmark index to path, refreshing it first if the graph changed
+        """
+        if self.landmarks is None:
+            raise ValueError('no landmark index, call build_landmarks() first')
+        if self.landmarks.version != self.version:
+            self.refresh_landmarks()
+        self.landmarks.save(path)
+
+    def load_landmarks(self, path):
+        """
+        reads an index written by save_landmarks(), it is trusted to belong to this graph
+        """
+        index = LandmarkIndex.load(path)
+        if index.v_count != self.v_count:
+            raise ValueError(f'landmark index has {index.v_count} vertices, graph has {self.v_count}')
+        index.version = self.version
+        self.landmarks = index
+        return index
+
+    def alt_query(self, src: int, dst: int):
+        """
+        point to point shortest path by A* with landmark lower bounds (ALT)
+        returns (distance, path, settled) where settled is the number of vertices
+        the search had to settle, (inf, [], settled) if dst can't be reached
+        a landmark index that is older than the graph is refreshed first
+        """
+        if self.landmarks is None:
+            raise ValueError('no landmark index, call build_landmarks() first')
+        if not self.has_vertex(src) or not self.has_vertex(dst):
+            return float('inf'), [], 0
+        if self.landmarks.version != self.version:
+            self.refresh_landmarks()
+        sink = self.probe
+        stats = begin(sink, 'alt_query')
+        bound = self.landmarks.bounds(dst)
+        inf = float('inf')
+        distance = {src: 0}
+        previous = {src: None}
+        settled = set()
+        heap = [(bound(src), 0, src)]       # ordered by distance so far + lower bound to dst
+        while len(heap) > 0:
+            _, d, v = heapq.heappop(heap)
+            if stats is not None:
+                stats.pops += 1
+            if v in settled:
+                continue        # stale heap entry
+            settled.add(v)
+            if v == dst:
+                break
+            neighbors = self.get_neighbors(v)
+            pushed = 0
+            for v_i, d_i in neighbors:
+                if d + d_i < distance.get(v_i, inf):
+                    h = bound(v_i)
+                    if h == inf:
+                        continue    # landmarks prove dst can't be reached from v_i
+                    distance[v_i] = d + d_i
+                    previous[v_i] = v
+                    heapq.heappush(heap, (d + d_i + h, d + d_i, v_i))
+                    pushed += 1
+            if stats is not None:
+                stats.scan(len(neighbors), pushed, len(heap))
+                stats.edges_relaxed += pushed
+        if stats is not None:
+            stats.vertices_visited = len(settled)
+            finish(sink, stats)
+        if dst not in settled:
+            return inf, [], len(settled)
+        path = [dst]
+        while path[-1] != src:
+            path.append(previous[path[-1]])
+        path.reverse()
+        return distance[dst], path, len(settled)
+
+
+def compact_int(weight) -> bool:
+    """True if weight can be stored in an array('I') row"""
+    return 0 <= weight < 2 ** 32 and weight == int(weight)     # range first, int() rejects inf and nan
+
+
+def parse_edge(fields):
+    """turns the fields of an edge list row into a (src, dst, weight) tuple"""
+    weight = 1
+    if len(fields) > 2:
+        try:
+            weight = int(fields[2])
+        except ValueError:
+            weight = float(fields[2])
+    return int(fields[0]), int(fields[1]), weight
+
+
+def dijkstra_csr(offsets, targets, weights, v_count, src) -> []:
+    """dijkstra's algorithm over CSR arrays, returns the distance list"""
+    distance = [float('inf')] * v_count
+    if src not in range(v_count):
+        return distance
+    distance[src] = 0
+    heap = [(0, src)]
+    while len(heap) > 0:
+        d, v = heapq.heappop(heap)
+        if d > distance[v]:
+            continue        # stale heap entry
+        start, end = offsets[v], offsets[v + 1]
+        for v_i, d_i in zip(targets[start:end], weights[start:end]):
+            if d + d_i < distance[v_i]:
+                distance[v_i] = d + d_i
+                heapq.heappush(heap, (d + d_i, v_i))
+    return distance
+
+
+worker_snapshot = None      # (blocks, offsets, targets, weights, result, v_count) in a worker process
+
+
+def dijkstra_worker_init(names, sizes, v_count) -> None:
+    """attaches a worker process to the shared CSR snapshot and result block"""
+    global worker_snapshot
+    blocks = [SharedMemory(name=name) for name in names]
+    views = [block.buf[:size].cast(code) for block, size, code in zip(blocks, sizes, 'qqdd')]
+    worker_snapshot = (blocks, *views, v_count)
+
+
+def dijkstra_worker(tasks) -> None:
+    """computes the (row, source) tasks and writes each row into the result block"""
+    blocks, offsets, targets, weights, result, v_count = worker_snapshot
+    for row, src in tasks:
+        result[row * v_count:(row + 1) * v_count] = array('d', dijkstra_csr(offsets, targets, weights, v_count, src))
+
+class ReachabilityIndex:
+    """
+    transitive closure of a DirectedGraph as one python int bitset per strongly
+    connected component, bit d of reach[c] is set when component c reaches component d
+    """
+
+    def __init__(self, graph):
+        self.component = []     # component id of every vertex
+        self.reach = []         # reach[c] = bitset of the components c reaches
+        self.stale = False      # set when edges were removed, see rebuild()
+        self.rebuild(graph)
+
+    def rebuild(self, graph) -> None:
+        """computes the bitsets from scratch, one pass over the condensation"""
+        components = graph.strongly_connected_components()
+        self.component = [0] * graph.v_count
+        for c, members in enumerate(components):
+            for v in members:
+                self.component[v] = c
+        self.reach = []
+        for c, members in enumerate(components):
+            # tarjan lists every component after the ones it has edges to,
+            # so their bitsets are already done
+            bits = 1 << c
+            for v in members:
+                for w, _ in graph.get_neighbors(v):
+                    if self.component[w] != c:
+                        bits |= self.reach[self.component[w]]
+            self.reach.append(bits)
+        for v in sorted(graph.removed):     # left out by tarjan, give them a component for add_vertex()
+            self.component[v] = len(self.reach)
+            self.reach.append(1 << len(self.reach))
+        self.stale = False
+
+    def grow(self, v_count) -> None:
+        """gives every vertex added since the last call a component of its own"""
+        while len(self.component) < v_count:
+            self.component.append(len(self.reach))
+            self.reach.append(1 << len(self.reach))
+
+    def insert(self, src, dst) -> None:
+        """
+        updates the bitsets for a new edge src -> dst: every component that reaches src
+        now also reaches everything dst reaches
+        a cycle closed by the edge doesn't merge components, their bitsets just become equal
+        """
+        if self.stale:
+            return
+        c_src, c_dst = self.component[src], self.component[dst]
+        if (self.reach[c_src] >> c_dst) & 1:
+            return      # dst was already reachable, nothing changes
+        added = self.reach[c_dst]
+        bit = 1 << c_src
+        for c, bits in enumerate(self.reach):
+            if bits & bit:
+                self.reach[c] = bits | added
+
+    def query(self, src, dst) -> bool:
+        return (self.reach[self.component[src]] >> self.component[dst]) & 1 == 1
+
+
+def reverse_csr(offsets, targets, weights, v_count):
+    """returns the CSR arrays of the graph with every edge turned around"""
+    counts = [0] * (v_count + 1)
+    for dst in targets:
+        counts[dst + 1] += 1
+    for v in range(v_count):
+        counts[v + 1] += counts[v]      # running sum turns the counts into offsets
+    r_offsets = array('q', counts)
+    r_targets = array('q', bytes(8 * len(targets)))
+    r_weights = array('d', bytes(8 * len(targets)))
+    for src in range(v_count):
+        for i in range(offsets[src], offsets[src + 1]):
+            slot = counts[targets[i]]
+            counts[targets[i]] += 1
+            r_targets[slot] = src
+            r_weights[slot] = weights[i]
+    return r_offsets, r_targets, r_weights
+
+
+class LandmarkIndex:
+    """
+    precomputed distances from and to k landmark vertices of a DirectedGraph
+    by the triangle inequality every landmark L gives two lower bounds on d(v, t):
+    d(L, t) - d(L, v) and d(v, L) - d(t, L), alt_query() uses the best one as A* heuristic
+    """
+
+    def __init__(self, v_count, landmarks, forward, backward, version=None):
+        self.v_count = v_count
+        self.landmarks = landmarks      # landmark vertex ids
+        self.forward = forward          # forward[i][v] = d(landmarks[i], v)
+        self.backward = backward        # backward[i][v] = d(v, landmarks[i])
+        self.version = version          # graph version the distances belong to
+
+    @classmethod
+    def build(cls, graph, k=8):
+        """picks k landmarks far apart from each other and computes their distances"""
+        index = cls(graph.v_count, [], [], [])
+        index.refresh(graph, k)
+        return index
+
+    def refresh(self, graph, k=None) -> None:
+        """
+        recomputes the distances after the graph changed, landmarks are picked
+        again when k is given or the vertex count changed
+        """
+        offsets, targets, weights = graph.to_csr()
+        weights = array('d', weights)
+        reverse = reverse_csr(offsets, targets, weights, graph.v_count)
+        v_count = graph.v_count
+        if k is None and v_count == self.v_count:
+            self.forward = [array('d', dijkstra_csr(offsets, targets, weights, v_count, L)) for L in self.landmarks]
+            self.backward = [array('d', dijkstra_csr(*reverse, v_count, L)) for L in self.landmarks]
+        else:
+            self.pick(offsets, targets, weights, reverse, v_count, len(self.landmarks) if k is None else k,
+                      graph.removed)
+        self.v_count = v_count
+        self.version = graph.version
+
+    def pick(self, offsets, targets, weights, reverse, v_count, k, removed=()) -> None:
+        """
+        farthest point selection: every new landmark is the vertex whose round trip
+        distance to the closest landmark chosen so far is largest, removed ids are never picked
+        """
+        inf = float('inf')
+        self.landmarks, self.forward, self.backward = [], [], []
+        first = next((v for v in range(v_count) if v not in removed), None)
+        if first is None:
+            return
+        # the search starts from the first vertex, which is not kept as a landmark itself
+        start = (dijkstra_csr(offsets, targets, weights, v_count, first), dijkstra_csr(*reverse, v_count, first))
+        score = [(f if f != inf else 0) + (b if b != inf else 0) for f, b in zip(*start)]
+        for v in removed:
+            score[v] = -1
+        for _ in range(min(k, v_count - len(removed))):
+            L = max(range(v_count), key=score.__getitem__)
+            self.landmarks.append(L)
+            self.forward.append(array('d', dijkstra_csr(offsets, targets, weights, v_count, L)))
+            self.backward.append(array('d', dijkstra_csr(*reverse, v_count, L)))
+            for v, (f, b) in enumerate(zip(self.forward[-1], self.backward[-1])):
+                round_trip = (f if f != inf else 0) + (b if b != inf else 0)
+                if round_trip < score[v]:
+                    score[v] = round_trip
+            score[L] = -1       # never pick the same vertex twice
+
+    def bounds(self, dst):
+        """returns a function giving a lower bound on the distance from a vertex to dst"""
+        inf = float('inf')
+        pairs = [(f, f[dst], b, b[dst]) for f, b in zip(self.forward, self.backward)]
+
+        def bound(v):
+            best = 0
+            for f, f_dst, b, b_dst in pairs:
+                # inf - inf would be nan, so unreached landmarks are skipped
+                if f[v] != inf and f_dst - f[v] > best:
+                    best = f_dst - f[v]     # inf when L reaches v but not dst
+                if b_dst != inf and b[v] - b_dst > best:
+                    best = b[v] - b_dst     # inf when dst reaches L but v doesn't
+            return best
+        return bound
+
+    def save(self, path) -> None:
+        save_landmarks(path, self.v_count, self.landmarks, self.forward, self.backward)
+
+    @classmethod
+    def load(cls, path):
+        sections = load_landmarks(path)
+        return cls(sections['v_count'], sections['landmarks'], sections['forward'], sections['backward'])
 
 # Below is a series of tests showing that each method works properly
 
@@ -334,3 +1684,160 @@ if __name__ == '__main__':
     print('\n', g)
     for i in range(5):
         print(f'DIJKSTRA {i} {g.dijkstra(i)}')
+
+
+    print("\ncompact storage - integral float weights")
+    print("------------------------------------------")
+    edges = [(0, 1, 10.0), (4, 0, 12), (1, 4, 15.0), (4, 3, 3), (3, 1, 5.0)]
+    g = DirectedGraph(edges, storage='compact')
+    g.add_edge(3, 2, 7.0)
+    g.insert_edges([(2, 1, 23.0)])
+    print(g.compact_code, g.get_edges(), sep='\n')
+    g.add_edge(0, 3, float('inf'))      # not an unsigned int, the rows widen to doubles
+    print(g.compact_code, g.get_edges(), sep='\n')
+    g = DirectedGraph(storage='compact')
+    g.ingest([parse_edge(line.split()) for line in ('0 1 3.0', '1 2 4')])
+    print(g.compact_code, g.get_edges(), sep='\n')
+
+
+    print("\ntrack_topological_order() / would_create_cycle() example")
+    print("--------------------------------------------------------")
+    edges = [(0, 1, 10), (1, 4, 15), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    g.track_topological_order(reject_cycles=True)
+    print(g.topological_order())
+    for src, dst in [(4, 3), (2, 0), (0, 2), (2, 1)]:
+        print(f'{src} -> {dst} would create cycle: {g.would_create_cycle(src, dst)}')
+        g.add_edge(src, dst)    # dropped when it would close a cycle, the order is repaired otherwise
+        print(g.topological_order())
+    print(g.get_edges(), g.topological_order(), g.has_cycle(), sep='\n')
+
+
+    print("\nsnapshot() copy on write example")
+    print("--------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    for storage in ('dense', 'sparse', 'numpy', 'compact'):
+        g = DirectedGraph(edges, storage=storage)
+        snap, frozen = g.snapshot(), g.freeze()
+        g.add_edge(0, 2, 9)     # copies row 0 first, the snapshot keeps the old one
+        g.remove_edge(4, 0)
+        print(storage, g.get_edges() == snap.get_edges(), snap.get_edges() == frozen.get_edges(),
+              [g.get_weight(0, 2), g.get_weight(4, 0)], [snap.get_weight(0, 2), snap.get_weight(4, 0)])
+    try:
+        snap.add_edge(0, 3)
+    except TypeError as error:
+        print(error)
+
+
+    print("\nreachable() example")
+    print("-------------------")
+    edges = [(0, 1, 10), (1, 4, 15), (4, 3, 3), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    g.build_reachability()
+    print(g.reachable(0, 2), g.reachable(2, 0), g.reachable_many([(1, 3), (3, 1), (2, 2)]))
+    g.add_edge(2, 0)        # bitsets are updated in place, 2 now reaches everything
+    print(g.reachable(0, 2), g.reachable(2, 0), g.reachable_many([(1, 3), (3, 1), (2, 2)]))
+    g.remove_edge(4, 3)     # the index is rebuilt on the next query
+    print(g.reachable(0, 2), g.reachable(2, 0), g.reachable_many([(1, 3), (3, 1), (2, 2)]))
+
+
+    print("\nhas_cycle() / find_cycle() / strongly_connected_components() example")
+    print("--------------------------------------------------------------------")
+    edges = [(0, 1, 10), (1, 4, 15), (4, 3, 3), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    print(g.has_cycle(), g.find_cycle(), g.strongly_connected_components())
+    g.add_edge(3, 4)        # two vertices are enough for a cycle
+    print(g.has_cycle(), g.find_cycle(), g.strongly_connected_components())
+    g.add_edge(2, 0)
+    components, component, dag = g.condensation()
+    print(g.find_cycle(), components, component, dag.get_edges())
+    g = DirectedGraph([(v, v + 1, 1) for v in range(5000)] + [(5000, 0, 1)], storage='sparse')  # deeper than the recursion limit
+    print(len(g.find_cycle()), len(g.strongly_connected_components()))
+
+
+    print("\nremove_vertex() / add_vertex() / compact() example")
+    print("--------------------------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    for storage in ('dense', 'sparse', 'numpy', 'compact'):
+        g = DirectedGraph(edges, storage=storage)
+        g.remove_vertex(1)
+        print(storage, g.get_vertices(), g.get_edges(), g.dfs(1), g.dijkstra(4))
+        print(g.next_vertex(), g.add_vertex(), g.get_vertices())     # id 1 comes back without edges
+        g.add_edge(1, 3, 4)
+        g.remove_vertex(2)
+        print(g.compact(), g.get_edges())
+    print(g)
+
+
+    print("\nvalidate_paths() example")
+    print("------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    for paths in ([[0, 1, 4, 3], [1, 3, 2, 1], [0, 4], [2], []], [[0], [1]], []):
+        print(g.validate_paths(paths, weights=True, first_bad=True))
+    g.remove_vertex(2)      # a removed vertex is not a path on its own
+    print(g.validate_paths([[2], [0]], weights=True, first_bad=True))
+
+
+    print("\ndijkstra() with a target / shortest_path() example")
+    print("--------------------------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    print(g.dijkstra(0, 3))     # stops once 3 is settled, unsettled vertices stay inf
+    print(g.dijkstra(0, predecessors=True))
+    print(g.shortest_path(0, 2), g.shortest_path(2, 3), g.shortest_path(3, 3))
+
+
+    print("\ndijkstra_many() example")
+    print("-----------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    rows = g.dijkstra_many(range(5), workers=2)     # one shared memory block, two worker processes
+    print(all(list(row) == g.dijkstra(src) for src, row in enumerate(rows)))
+    print(g.dijkstra_many([4, 2], workers=1))
+
+
+    print("\nbuild_landmarks() / alt_query() example")
+    print("---------------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    g.build_landmarks(2)
+    print(g.landmarks.landmarks)
+    for src, dst in [(0, 2), (2, 0), (3, 3)]:
+        print(src, dst, g.alt_query(src, dst), g.dijkstra(src)[dst])
+    g.remove_edge(3, 2)         # the index is refreshed on the next query
+    print(g.alt_query(0, 2))
+
+
+    print("\nenable_cache() example")
+    print("----------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    g.enable_cache()
+    print(g.dfs(0), g.dfs(0), g.dijkstra(2), g.dijkstra(2))
+    print(g.cache_info())
+    g.add_edge(0, 2)            # any change makes the stored results stale
+    print(g.dfs(0), g.cache_info())
+
+
+    print("\ninstrument() example")
+    print("--------------------")
+    from graph_stats import StatsCollector
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    collector = StatsCollector()
+    g.instrument(collector)
+    g.bfs(2)
+    g.dijkstra(0)
+    g.has_cycle()
+    for stats in collector.records:
+        print(stats.method, stats.vertices_visited, stats.edges_scanned, stats.pushes, stats.pops, stats.peak_frontier)
+    g.instrument(None)
@@ -0,0 +1,176 @@
+# Description: file support shared by DirectedGraph and UndirectedGraph, a compact binary
+# format (save/load) and chunked edge list readers (ingest).
+# A binary file is a fixed header followed by 8 byte aligned sections:
+#   offsets       int64 * (v_count + 1)    neighbors of v are entries offsets[v]:offsets[v + 1]
+#   targets       int64 * entries          neighbor ids
+#   weights       int64 or float64 * entries   (directed graphs only)
+#   removed       int64 * removed count    ids of removed vertices (directed graphs only, the
+#                                          header keeps the count in the name bytes field)
+#   name_offsets  int64 * (v_count + 1)    (undirected graphs only)
+#   names         utf-8 bytes              vertex names, name v is names[name_offsets[v]:name_offsets[v + 1]]
+# A landmark index file (save_landmarks) uses the same header with k in place of entries:
+#   landmarks     int64 * k
+#   forward       float64 * k * v_count    distances from each landmark, one row per landmark
+#   backward      float64 * k * v_count    distances to each landmark
+
+import csv
+import mmap as memory_map
+import os
+import struct
+from array import array
+
+HEADER = struct.Struct('=8sqqqq8s')     # magic, byte order marker, v_count, entries, name bytes, weight typecode
+DIRECTED = b'DGRAPH01'
+UNDIRECTED = b'UGRAPH01'
+LANDMARKS = b'LMARKS01'
+
+
+def padding(size: int) -> bytes:
+    """zero bytes needed to bring size up to a multiple of 8"""
+    return b'\0' * (-size % 8)
+
+
+def integral(weights) -> bool:
+    """True if every weight is a whole number that fits an int64, inf and nan are not"""
+    return all(float(w).is_integer() and -2 ** 63 <= w < 2 ** 63 for w in weights)
+
+
+def save_csr(path, magic, offsets, targets, weights=None, names=None, removed=()) -> None:
+    """
+    writes a graph in compressed sparse row form to path
+    removed lists the ids of removed vertices of a directed graph
+    """
+    v_count = len(offsets) - 1
+    if weights is not None and integral(weights):
+        weights = array('q', (int(w) for w in weights))     # keep integer weights as integers
+    elif weights is not None:
+        weights = array('d', weights)
+    name_offsets = array('q', [0])
+    blob = bytearray()
+    for name in names or ():
+        blob += name.encode('utf-8')
+        name_offsets.append(len(blob))
+    code = weights.typecode.encode() if weights is not None else b''
+    removed = array('q', sorted(removed))
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(magic, 1, v_count, len(targets), len(blob) if names is not None else len(removed), code))
+        f.write(array('q', offsets).tobytes())
+        f.write(array('q', targets).tobytes())
+        if weights is not None:
+            f.write(weights.tobytes())
+        if magic == DIRECTED:
+            f.write(removed.tobytes())
+        if names is not None:
+            f.write(name_offsets.tobytes())
+            f.write(bytes(blob))
+            f.write(padding(len(blob)))
+
+
+def load_csr(path, magic, mmap=True) -> dict:
+    """
+    reads a file written by save_csr, returns its sections as memoryviews
+    with mmap=True the file is mapped read only and nothing is copied, so
+    processes loading the same file share one copy in the page cache
+    """
+    with open(path, 'rb') as f:
+        if mmap:
+            buffer = memory_map.mmap(f.fileno(), 0, access=memory_map.ACCESS_READ)
+        else:
+            buffer = f.read()
+    view = memoryview(buffer)
+    found, marker, v_count, entries, name_bytes, code = HEADER.unpack_from(view)
+    if found != magic:
+        raise ValueError(f'{path} is not a {magic.decode()} file')
+    if marker != 1:
+        raise ValueError(f'{path} was written with a different byte order')
+    sections = {'v_count': v_count}
+    position = HEADER.size
+
+    def take(name, typecode, count):
+        nonlocal position
+        size = count * array(typecode).itemsize
+        sections[name] = view[position:position + size].cast(typecode)
+        position += size + len(padding(size))
+
+    take('offsets', 'q', v_count + 1)
+    take('targets', 'q', entries)
+    code = code.rstrip(b'\0').decode()
+    if code:
+        take('weights', code, entries)
+    if magic == DIRECTED:
+        take('removed', 'q', name_bytes)
+    if magic == UNDIRECTED:
+        take('name_offsets', 'q', v_count + 1)
+        take('names', 'B', name_bytes)
+    return sections
+
+
+def save_landmarks(path, v_count, landmarks, forward, backward) -> None:
+    """
+    writes a landmark index, forward and backward hold one distance row per landmark
+    """
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(LANDMARKS, 1, v_count, len(landmarks), 0, b'd'))
+        f.write(array('q', landmarks).tobytes())
+        for row in list(forward) + list(backward):
+            f.write(array('d', row).tobytes())
+
+
+def load_landmarks(path) -> dict:
+    """
+    reads a file written by save_landmarks into arrays
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    found, marker, v_count, k, _, _ = HEADER.unpack_from(data)
+    if found != LANDMARKS:
+        raise ValueError(f'{path} is not a {LANDMARKS.decode()} file')
+    if marker != 1:
+        raise ValueError(f'{path} was written with a different byte order')
+    position = HEADER.size
+    landmarks = array('q', data[position:position + 8 * k])
+    position += 8 * k
+    rows = []
+    for _ in range(2 * k):
+        rows.append(array('d', data[position:position + 8 * v_count]))
+        position += 8 * v_count
+    return {'v_count': v_count, 'landmarks': list(landmarks), 'forward': rows[:k], 'backward': rows[k:]}
+
+
+def edge_rows(lines, delimiter=None):
+    """splits lines into fields, on whitespace by default or as csv with a delimiter"""
+    if delimiter is not None:
+        yield from csv.reader(lines, delimiter=delimiter)
+        return
+    for line in lines:
+        yield line.split()
+
+
+def edge_chunks(source, parse, chunk_size, delimiter=None, header=False):
+    """
+    yields lists of at most chunk_size edges read from source, which can be a path
+    to an edge list or csv file, an open text file, or an iterable of edge tuples
+    file rows are turned into edges by parse, blank rows and rows starting with # are skipped
+    only one chunk is held in memory at a time
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if delimiter is None and str(source).endswith('.csv'):
+            delimiter = ','
+        with open(source, newline='') as f:
+            yield from edge_chunks(f, parse, chunk_size, delimiter, header)
+        return
+    if hasattr(source, 'read'):
+        rows = edge_rows(source, delimiter)
+        if header:
+            next(rows, None)
+        edges = (parse(row) for row in rows if row and not row[0].startswith('#'))
+    else:
+        edges = iter(source)
+    chunk = []
+    for edge in edges:
+        chunk.append(edge)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
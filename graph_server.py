@@ -0,0 +1,328 @@
+# Description: asyncio query front end for DirectedGraph and UndirectedGraph, speaking
+# line delimited JSON over stdio or a local socket. One request per line:
+#   {"id": 1, "graph": "roads", "method": "dijkstra", "args": [0]}
+# answered (possibly out of order) with
+#   {"id": 1, "result": [...], "ms": 0.42}   or   {"id": 1, "error": "..."}
+# json has no infinity, so unreachable distances (inf) and nan come back as null.
+# Reads run in a thread pool so the event loop keeps serving, identical reads in flight
+# share one computation, and mutations are queued and applied in batches between reads.
+# Every request sees the mutations that arrived before it and none of the later ones.
+#
+#   python graph_server.py --directed roads=roads.txt --undirected friends=friends.csv --socket /tmp/graphs.sock
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from d_graph import DirectedGraph
+from ud_graph import UndirectedGraph
+
+READS = {'dijkstra', 'shortest_path', 'alt_query', 'bfs', 'bfs_levels', 'dfs', 'is_valid_path',
+         'validate_paths', 'has_cycle', 'topological_order', 'count_connected_components',
+         'same_component', 'distance', 'get_vertices', 'get_edges'}
+MUTATIONS = {'add_vertex', 'add_edge', 'remove_edge', 'remove_vertex', 'insert_edges', 'compact'}
+# reads that may rebuild state the graph keeps between calls, never run two of them at once
+STATEFUL = {'topological_order', 'alt_query', 'count_connected_components', 'same_component', 'validate_paths',
+            'bfs_levels'}
+
+
+def plain(value):
+    """
+    turns a result into values json can write: numpy arrays and numbers become lists and
+    numbers, tuples and other iterables become lists, inf and nan become None (null)
+    """
+    if hasattr(value, 'tolist'):
+        value = value.tolist()
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if value is None or isinstance(value, (str, int)):
+        return value
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    return [plain(item) for item in value]
+
+
+class LatencyStats:
+    """
+    Request counters and recent latencies of one method
+    """
+
+    def __init__(self, keep=1000):
+        self.calls = 0
+        self.errors = 0
+        self.coalesced = 0      # requests answered by a computation already in flight
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=keep)
+
+    def record(self, ms, error=False, coalesced=False) -> None:
+        self.calls += 1
+        self.errors += error
+        self.coalesced += coalesced
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.recent.append(ms)
+
+    def as_dict(self) -> dict:
+        ordered = sorted(self.recent)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+        return {'calls': self.calls, 'errors': self.errors, 'coalesced': self.coalesced,
+                'mean_ms': self.total_ms / self.calls if self.calls else 0.0, 'max_ms': self.max_ms,
+                'p50_ms': percentile(0.5), 'p99_ms': percentile(0.99)}
+
+
+class GraphServer:
+    """
+    Serves queries on a set of named graphs, see the module description for the protocol
+    the "metrics" method returns the latency statistics of every method
+    """
+
+    def __init__(self, graphs, workers=4):
+        self.graphs = graphs                # name -> DirectedGraph or UndirectedGraph
+        self.executor = ThreadPoolExecutor(workers)
+        self.locks = {name: threading.Lock() for name in graphs}
+        self.in_flight = {}     # (graph, method, args, version) -> future of the running read
+        self.readers = 0        # reads currently running in the executor
+        self.sequence = 0       # arrival number of the newest request
+        self.pending = deque()  # queued mutations (sequence, graph, method, args, future), oldest first
+        self.waiting = set()    # arrival numbers of reads waiting for earlier mutations
+        self.last_mutation = None       # future of the newest mutation, done once it is applied
+        self.flushing = False   # a batch of mutations is running in the executor
+        self.flush_scheduled = False
+        self.metrics = {}       # method -> LatencyStats
+
+    def graph_name(self, name):
+        if name is None and len(self.graphs) == 1:
+            return next(iter(self.graphs))
+        if name not in self.graphs:
+            raise KeyError(f'unknown graph: {name!r}')
+        return name
+
+    async def read(self, name, method, args, sequence):
+        """
+        runs a read in the executor once every mutation that arrived before it is applied,
+        sharing the result with identical reads in flight
+        """
+        before = self.last_mutation
+        if before is not None and not before.done():
+            self.waiting.add(sequence)      # later mutations are held back until this read ran
+            try:
+                await asyncio.wait([before])    # mutations are applied in arrival order
+            finally:
+                self.waiting.discard(sequence)
+                self.schedule_flush()
+        graph = self.graphs[name]
+        key = (name, method, json.dumps(args), graph.version)
+        if key in self.in_flight:
+            return await asyncio.shield(self.in_flight[key]), True
+        call = getattr(graph, method)
+        if method in STATEFUL:
+            lock = self.locks[name]
+
+            def run():
+                with lock:
+                    return plain(call(*args))
+        else:
+            def run():
+                return plain(call(*args))     # converted in the executor, not on the event loop
+        future = asyncio.get_running_loop().run_in_executor(self.executor, run)
+        self.in_flight[key] = future
+        self.readers += 1
+        try:
+            return await asyncio.shield(future), False
+        finally:
+            self.readers -= 1
+            self.in_flight.pop(key, None)
+            if self.readers == 0:
+                self.schedule_flush()
+
+    async def mutate(self, name, method, args, sequence):
+        """queues a mutation, it is applied with the others once the reads before it are done"""
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((sequence, name, method, args, future))
+        self.last_mutation = future
+        self.schedule_flush()
+        return await future
+
+    def schedule_flush(self) -> None:
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self.flush)    # collect this loop tick's mutations
+
+    def flush(self) -> None:
+        """
+        starts the next batch in the executor, the queued mutations that arrived before
+        every waiting read, when no reads and no other batch are running
+        """
+        self.flush_scheduled = False
+        if self.flushing or self.readers > 0:
+            return
+        limit = min(self.waiting, default=self.sequence + 1)
+        batch = []
+        while len(self.pending) > 0 and self.pending[0][0] < limit:
+            batch.append(self.pending.popleft())
+        if len(batch) == 0:
+            return      # a read is about to start, it flushes again when it is done
+        self.flushing = True
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self.apply, batch)
+        future.add_done_callback(lambda done: self.applied(batch, done.result()))
+
+    def apply(self, batch) -> []:
+        """runs in the executor, applies a batch in arrival order and returns (ok, result) pairs"""
+        results = []
+        for _, name, method, args, _ in batch:
+            try:
+                with self.locks[name]:
+                    results.append((True, plain(getattr(self.graphs[name], method)(*args))))
+            except Exception as error:
+                results.append((False, error))
+        return results
+
+    def applied(self, batch, results) -> None:
+        """answers the mutations of a finished batch and starts the next one"""
+        self.flushing = False
+        for (_, _, _, _, future), (ok, result) in zip(batch, results):
+            if future.done():
+                continue        # the request was cancelled
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
+        self.schedule_flush()
+
+    async def handle(self, line):
+        """answers one request line, returns the response as a dict"""
+        start = time.perf_counter()
+        request = {}
+        method = None
+        coalesced = False
+        try:
+            request = json.loads(line)
+            method = request.get('method')
+            args = request.get('args', [])
+            self.sequence += 1      # numbered before the first await, so in arrival order
+            if method == 'metrics':
+                result = {m: stats.as_dict() for m, stats in self.metrics.items()}
+            elif method in READS:
+                result, coalesced = await self.read(self.graph_name(request.get('graph')), method, args,
+                                                    self.sequence)
+            elif method in MUTATIONS:
+                result = await self.mutate(self.graph_name(request.get('graph')), method, args, self.sequence)
+            else:
+                raise ValueError(f'unknown method: {method!r}')
+            response = {'id': request.get('id'), 'result': result}
+        except Exception as error:
+            response = {'id': request.get('id') if isinstance(request, dict) else None,
+                        'error': f'{type(error).__name__}: {error}'}
+        ms = (time.perf_counter() - start) * 1000
+        response['ms'] = ms
+        if method != 'metrics':
+            # one entry for all unknown methods, client input must not grow the dict
+            key = method if method in READS or method in MUTATIONS else 'unknown'
+            stats = self.metrics.setdefault(key, LatencyStats())
+            stats.record(ms, 'error' in response, coalesced)
+        return response
+
+    async def serve(self, reader, write) -> None:
+        """
+        reads request lines until end of input, write(line) sends one response line
+        requests are handled concurrently and answered as soon as they are done
+        """
+        tasks = set()
+
+        async def answer(line):
+            response = await self.handle(line)
+            await write(json.dumps(response, allow_nan=False) + '\n')
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.create_task(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+
+async def serve_stdio(server) -> None:
+    """serves requests read from stdin, responses go to stdout"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    async def write(text):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    await server.serve(reader, write)
+
+
+async def serve_socket(server, path=None, host='127.0.0.1', port=None) -> None:
+    """serves every connection to a unix socket at path, or a tcp port on host"""
+    async def connection(reader, writer):
+        lock = asyncio.Lock()
+
+        async def write(text):
+            async with lock:
+                writer.write(text.encode())
+                await writer.drain()
+
+        try:
+            await server.serve(reader, write)
+        finally:
+            writer.close()
+
+    if path is not None:
+        listener = await asyncio.start_unix_server(connection, path)
+    else:
+        listener = await asyncio.start_server(connection, host, port)
+    async with listener:
+        await listener.serve_forever()
+
+
+def load_graph(cls, spec):
+    """builds a graph from "name=path", .bin files are load()ed, anything else is ingest()ed"""
+    name, _, path = spec.partition('=')
+    if path.endswith('.bin'):
+        return name, cls.load(path)
+    graph = cls()
+    graph.ingest(path)
+    return name, graph
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='serve graph queries as line delimited JSON')
+    parser.add_argument('--directed', nargs='*', default=[], metavar='NAME=PATH', help='DirectedGraph files')
+    parser.add_argument('--undirected', nargs='*', default=[], metavar='NAME=PATH', help='UndirectedGraph files')
+    parser.add_argument('--socket', help='unix socket path, stdio is used when neither --socket nor --port is given')
+    parser.add_argument('--port', type=int, help='tcp port on 127.0.0.1')
+    parser.add_argument('--workers', type=int, default=4, help='threads running reads')
+    args = parser.parse_args(argv)
+
+    graphs = dict([load_graph(DirectedGraph, spec) for spec in args.directed] +
+                  [load_graph(UndirectedGraph, spec) for spec in args.undirected])
+
+    async def start():
+        server = GraphServer(graphs, args.workers)
+        if args.socket is not None or args.port is not None:
+            await serve_socket(server, args.socket, port=args.port)
+        else:
+            await serve_stdio(server)
+
+    asyncio.run(start())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
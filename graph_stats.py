@@ -0,0 +1,71 @@
+# Description: optional instrumentation for the graph algorithms, shared by DirectedGraph
+# and UndirectedGraph. graph.instrument(sink) makes the traversal, cycle, component and
+# dijkstra helpers fill in a CallStats per call and hand it to sink when the call ends.
+# With no sink the helpers only pay for an "is None" check per step.
+
+import time
+from collections import deque
+
+
+class CallStats:
+    """
+    Counters and wall clock time of one algorithm call
+    """
+    __slots__ = ('method', 'vertices_visited', 'edges_scanned', 'edges_relaxed',
+                 'pushes', 'pops', 'peak_frontier', 'seconds', 'started')
+
+    def __init__(self, method):
+        self.method = method
+        self.vertices_visited = 0
+        self.edges_scanned = 0
+        self.edges_relaxed = 0
+        self.pushes = 0         # queue, stack, heap or recursion pushes
+        self.pops = 0
+        self.peak_frontier = 0  # largest queue/stack/heap size seen
+        self.seconds = 0.0
+        self.started = time.perf_counter()
+
+    def scan(self, scanned, pushed, frontier) -> None:
+        """records the edges scanned from one vertex and the pushes they caused"""
+        self.edges_scanned += scanned
+        self.pushes += pushed
+        if frontier > self.peak_frontier:
+            self.peak_frontier = frontier
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'started'}
+
+    def __repr__(self):
+        return f'CallStats({self.as_dict()})'
+
+
+class StatsCollector:
+    """
+    Sink that keeps the most recent records and running totals per method
+    """
+
+    def __init__(self, keep=1000):
+        self.records = deque(maxlen=keep)
+        self.totals = {}
+
+    def __call__(self, stats) -> None:
+        self.records.append(stats)
+        total = self.totals.setdefault(stats.method, {'calls': 0})
+        total['calls'] += 1
+        for name, value in stats.as_dict().items():
+            if name == 'peak_frontier':
+                total[name] = max(total.get(name, 0), value)
+            elif name != 'method':
+                total[name] = total.get(name, 0) + value
+
+
+def begin(sink, method):
+    """returns a new CallStats when instrumentation is on, None otherwise"""
+    return CallStats(method) if sink is not None else None
+
+
+def finish(sink, stats) -> None:
+    """stops the clock on stats and hands it to the sink"""
+    if stats is not None:
+        stats.seconds = time.perf_counter() - stats.started
+        sink(stats)
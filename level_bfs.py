@@ -0,0 +1,129 @@
+# Description: frontier at a time breadth first search over compressed sparse row arrays,
+# shared by DirectedGraph.bfs_levels and UndirectedGraph.bfs_levels.
+# With numpy every level is expanded with a handful of array operations, either top-down
+# (gather the out-edges of the frontier) or bottom-up (gather the in-edges of the unvisited
+# vertices and keep those coming from the frontier), whichever scans fewer edges.
+# Without numpy the same levels and parents are computed with plain lists, top-down only.
+# In both cases the parent of a vertex is its smallest neighbor on the previous level.
+
+from graph_stats import begin, finish
+
+try:
+    import numpy as np
+except ImportError:     # the list version below is used instead
+    np = None
+
+
+def gather(offsets, targets, vertices):
+    """returns (owner, neighbor) arrays with one entry per edge of the given vertices"""
+    starts = offsets[vertices]
+    counts = offsets[vertices + 1] - starts
+    total = int(counts.sum())
+    owner = np.repeat(vertices, counts)
+    # edge i of the run belonging to vertex v sits at targets[offsets[v] + i]
+    run_start = np.repeat(np.cumsum(counts) - counts, counts)
+    index = np.repeat(starts, counts) + (np.arange(total) - run_start)
+    return owner, targets[index]
+
+
+def reverse_arrays(offsets, targets, v_count):
+    """returns the csr arrays of the in-edges"""
+    sources = np.repeat(np.arange(v_count), np.diff(offsets))
+    order = np.argsort(targets, kind='stable')
+    in_offsets = np.zeros(v_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets, minlength=v_count), out=in_offsets[1:])
+    return in_offsets, sources[order]
+
+
+def level_bfs(offsets, targets, v_count, source, reverse=None, direction='auto', sink=None):
+    """
+    returns (levels, parents) int64 arrays, levels[v] is the number of edges on a shortest
+    path from source to v, parents[v] the vertex before v on it, both -1 when v isn't reached
+    (parents[source] is source)
+    reverse is the (in_offsets, in_targets) pair for bottom-up steps, computed on the first one
+    direction is 'auto', 'top-down' or 'bottom-up'
+    """
+    stats = begin(sink, 'bfs_levels')
+    offsets = np.asarray(offsets, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    levels = np.full(v_count, -1, dtype=np.int64)
+    parents = np.full(v_count, -1, dtype=np.int64)
+    if source not in range(v_count):
+        finish(sink, stats)
+        return levels, parents
+    visited = np.zeros(v_count, dtype=bool)
+    visited[source] = True
+    levels[source] = 0
+    parents[source] = source
+    frontier = np.array([source], dtype=np.int64)
+    out_degree = np.diff(offsets)
+    in_degree = np.bincount(targets, minlength=v_count)
+    unvisited_edges = len(targets) - int(in_degree[source])     # in-edges of the unvisited vertices
+    level = 0
+    while len(frontier) > 0:
+        level += 1
+        frontier_edges = int(out_degree[frontier].sum())
+        if direction == 'bottom-up' or (direction == 'auto' and frontier_edges > unvisited_edges):
+            if reverse is None:
+                reverse = reverse_arrays(offsets, targets, v_count)
+            in_frontier = np.zeros(v_count, dtype=bool)
+            in_frontier[frontier] = True
+            candidates = np.flatnonzero(~visited)
+            owner, src = gather(reverse[0], reverse[1], candidates)
+            hit = in_frontier[src]
+            scanned = len(src)
+            owner, src = owner[hit], src[hit]
+            frontier, first = np.unique(owner, return_index=True)
+            if len(frontier) > 0:
+                # owners come in ascending runs, take the smallest source of every run
+                parents[frontier] = np.minimum.reduceat(src, first)
+        else:
+            owner, dst = gather(offsets, targets, frontier)
+            new = ~visited[dst]
+            scanned = len(dst)
+            frontier, first = np.unique(dst[new], return_index=True)
+            parents[frontier] = owner[new][first]
+        visited[frontier] = True
+        levels[frontier] = level
+        unvisited_edges -= int(in_degree[frontier].sum())
+        if stats is not None:
+            stats.vertices_visited += len(frontier)
+            stats.scan(scanned, len(frontier), len(frontier))
+    if stats is not None:
+        stats.vertices_visited += 1     # the source
+    finish(sink, stats)
+    return levels, parents
+
+
+def level_bfs_lists(offsets, targets, v_count, source, sink=None):
+    """level_bfs without numpy, returns (levels, parents) lists"""
+    stats = begin(sink, 'bfs_levels')
+    levels = [-1] * v_count
+    parents = [-1] * v_count
+    if source not in range(v_count):
+        finish(sink, stats)
+        return levels, parents
+    levels[source] = 0
+    parents[source] = source
+    frontier = [source]
+    level = 0
+    while len(frontier) > 0:
+        level += 1
+        found = []
+        for v in frontier:      # frontier is sorted, so the smallest parent claims a vertex first
+            for w in targets[offsets[v]:offsets[v + 1]]:
+                if levels[w] == -1:
+                    levels[w] = level
+                    parents[w] = v
+                    found.append(w)
+            if stats is not None:
+                stats.scan(offsets[v + 1] - offsets[v], 0, len(frontier))
+        found.sort()
+        frontier = found
+        if stats is not None:
+            stats.vertices_visited += len(found)
+            stats.pushes += len(found)
+    if stats is not None:
+        stats.vertices_visited += 1
+    finish(sink, stats)
+    return levels, parents
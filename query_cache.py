@@ -0,0 +1,76 @@
+# Description: opt-in memoization of graph queries, shared by DirectedGraph and UndirectedGraph.
+# Every graph keeps a version counter that its mutating methods bump, results are cached
+# under (method, arguments, version) so a mutation makes all older entries unreachable.
+
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+
+class QueryCache:
+    """
+    Bounded least recently used cache of query results with hit/miss counters
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.version = None     # graph version the entries belong to
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()    # queries may run in several threads (graph_server.py)
+
+    def get(self, key, version):
+        """returns (True, value) on a hit and (False, None) on a miss"""
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()        # graph changed, nothing stored is valid anymore
+                self.version = version
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, self.entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value) -> None:
+        with self.lock:
+            self.entries[key] = value
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)    # drop the least recently used entry
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def info(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries), 'maxsize': self.maxsize}
+
+
+def fresh_copy(value):
+    """copies list results so callers can't change what is stored in the cache"""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, tuple):
+        return tuple(fresh_copy(v) for v in value)
+    return value
+
+
+def cached(method):
+    """
+    decorator for graph query methods, looks results up in graph.cache when
+    caching is enabled and calls the method directly otherwise
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.cache is None:
+            return method(self, *args, **kwargs)
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            hit, value = self.cache.get(key, self.version)
+        except TypeError:       # unhashable arguments can't be cached
+            return method(self, *args, **kwargs)
+        if not hit:
+            value = method(self, *args, **kwargs)
+            self.cache.put(key, value)
+        return fresh_copy(value)
+    return wrapper
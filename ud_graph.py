@@ -3,6 +3,215 @@
 # Assignment: 6
 # Description: implementation of an undirected graph
 
+from array import array
+from collections import deque
+from collections.abc import Mapping, MutableMapping
+
+from graph_file import UNDIRECTED, edge_chunks, load_csr, save_csr
+from graph_stats import begin, finish
+from level_bfs import level_bfs, level_bfs_lists
+from query_cache import QueryCache, cached
+
+try:
+    import numpy as np
+except ImportError:     # bfs_levels falls back to lists
+    np = None
+
+
+class NeighborSet(dict):
+    """
+    Insertion ordered set of neighbors that also supports the list methods
+    used by the graph (append, remove), membership and removal are O(1)
+    """
+
+    def __init__(self, items=()):
+        super().__init__((v, None) for v in items)
+
+    def append(self, v) -> None:
+        self[v] = None
+
+    def remove(self, v) -> None:
+        del self[v]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class InternedNeighbors:
+    """
+    Neighbor list of one vertex in an InternedAdjacency, translates names to ids
+    """
+
+    def __init__(self, adjacency, i):
+        self.adjacency = adjacency
+        self.ids = adjacency.neighbors[i]
+
+    def append(self, v) -> None:
+        self.ids.append(self.adjacency.ids[v])
+
+    def extend(self, vs) -> None:
+        for v in vs:
+            self.append(v)
+
+    def remove(self, v) -> None:
+        self.ids.remove(self.adjacency.ids[v])
+
+    def __contains__(self, v):
+        i = self.adjacency.ids.get(v)
+        return i is not None and i in self.ids
+
+    def __iter__(self):
+        names = self.adjacency.names
+        return (names[i] for i in self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class InternedAdjacency(MutableMapping):
+    """
+    Adjacency list that maps every vertex name to a dense integer id once and
+    keeps neighbor lists as array('i') of ids, names are only used at the API boundary
+    """
+
+    def __init__(self):
+        self.ids = {}           # name -> id, in the order vertices were added
+        self.names = []         # id -> name, None for a free id
+        self.neighbors = []     # id -> array of neighbor ids
+        self.free = []          # ids of removed vertices, reused first
+        self.rank = None        # id -> position of its name in sorted order, built lazily
+
+    def __getitem__(self, v):
+        return InternedNeighbors(self, self.ids[v])
+
+    def __setitem__(self, v, items):
+        i = self.ids.get(v)
+        if i is None:
+            if len(self.free) > 0:
+                i = self.free.pop()
+                self.names[i] = v
+            else:
+                i = len(self.names)
+                self.names.append(v)
+                self.neighbors.append(None)
+            self.ids[v] = i
+            self.rank = None
+        self.neighbors[i] = array('i', (self.ids[n] for n in items))
+
+    def __delitem__(self, v):
+        i = self.ids.pop(v)
+        self.names[i] = None
+        self.neighbors[i] = array('i')
+        self.free.append(i)
+        self.rank = None
+
+    def __contains__(self, v):
+        return v in self.ids
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def ranks(self) -> []:
+        """Return the rank of every id in lexicographical order of the names"""
+        if self.rank is None:
+            self.rank = [0] * len(self.names)
+            for r, name in enumerate(sorted(self.ids)):
+                self.rank[self.ids[name]] = r
+        return self.rank
+
+
+class CSRAdjacency(Mapping):
+    """
+    Read only adjacency list over compressed sparse row arrays, maps each
+    vertex name to the list of its neighbors like adj_list does
+    """
+
+    def __init__(self, names, offsets, targets):
+        self.names = names
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.offsets = offsets
+        self.targets = targets
+
+    def __getitem__(self, v):
+        i = self.ids[v]
+        return [self.names[t] for t in self.targets[self.offsets[i]:self.offsets[i + 1]]]
+
+    def __contains__(self, v):
+        return v in self.ids
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class UnionFind:
+    """
+    Disjoint sets with path compression and union by rank
+    """
+
+    def __init__(self, items=()):
+        self.parent = {}
+        self.rank = {}
+        self.count = 0      # number of disjoint sets
+        for v in items:
+            self.add(v)
+
+    def add(self, v) -> None:
+        if v not in self.parent:
+            self.parent[v] = v
+            self.rank[v] = 0
+            self.count += 1
+
+    def find(self, v):
+        root = v
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[v] != root:       # point every vertex on the way straight at the root
+            self.parent[v], v = root, self.parent[v]
+        return root
+
+    def union(self, u, v) -> None:
+        u, v = self.find(u), self.find(v)
+        if u == v:
+            return
+        if self.rank[u] < self.rank[v]:
+            u, v = v, u
+        self.parent[v] = u      # attach the shorter tree under the taller one
+        if self.rank[u] == self.rank[v]:
+            self.rank[u] += 1
+        self.count -= 1
+
+
+class IdUnionFind(UnionFind):
+    """
+    UnionFind over the dense integer ids of interned storage, parents and ranks
+    are arrays indexed by id so no vertex name is hashed while sets are merged
+    """
+
+    def __init__(self, size=0):
+        self.parent = array('i', range(size))
+        self.rank = bytearray(size)     # union by rank keeps ranks below 32
+        self.present = bytearray(size)  # 1 for the ids that were added, free ids stay out of count
+        self.count = 0
+
+    def add(self, i) -> None:
+        if i >= len(self.parent):
+            grow = i + 1 - len(self.parent)
+            self.parent.extend(range(len(self.parent), i + 1))
+            self.rank.extend(bytes(grow))
+            self.present.extend(bytes(grow))
+        if not self.present[i]:
+            self.present[i] = 1
+            self.count += 1
+
 
 class UndirectedGraph:
     """
@@ -13,18 +222,47 @@ class UndirectedGraph:
     - vertex names are strings
     """
 
-    def __init__(self, start_edges=None):
+    def __init__(self, start_edges=None, storage='list'):
         """
         Store graph info as adjacency list
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        storage='set' keeps each neighbor list in a NeighborSet so edge
+        lookups, add_edge and remove_edge are O(1)
+        storage='interned' maps names to integer ids and keeps neighbors in int
+        arrays (see InternedAdjacency), traversals then run on ids only
+        (graphs returned by load() use read only storage='csr' until they are changed)
         """
-        self.adj_list = dict()
+        if storage not in ('list', 'set', 'interned'):
+            raise ValueError(f'unknown storage mode: {storage!r}')
+        self.storage = storage
+        self.adj_list = InternedAdjacency() if storage == 'interned' else dict()
+        self.components = IdUnionFind() if storage == 'interned' else UnionFind()   # kept up to date by add_vertex/add_edge
+        self.components_stale = False   # set by removals, components are rebuilt on next query
+        self.version = 0        # bumped by every mutating method
+        self.cache = None       # QueryCache, see enable_cache()
+        self.probe = None       # instrumentation sink, see instrument()
+        self.frozen = False     # snapshots and frozen copies can't be changed
+        self.shared_rows = set()    # neighbor lists still shared with a snapshot, copied before a write
+        self.level_csr = None   # [version, names, ids, offsets, targets] kept for bfs_levels()
+        self.edge_index = None  # [version, {vertex: set of neighbors}] for validate_paths()
 
         # populate graph with initial vertices and edges (if provided)
-        # before using, implement add_vertex() and add_edge() methods
+        # edges are deduplicated and inserted in a single pass
         if start_edges is not None:
-            for u, v in start_edges:
-                self.add_edge(u, v)
+            self.insert_edges(start_edges)
+
+    @classmethod
+    def from_edges(cls, edges, storage='list'):
+        """
+        Build a graph from (u, v) pairs, any iterable works
+        """
+        return cls(edges, storage)
+
+    @classmethod
+    def from_arrays(cls, u, v, storage='list'):
+        """
+        Build a graph from parallel sequences of vertex names
+        """
+        return cls(zip(u, v), storage)
 
     def __str__(self):
         """
@@ -40,49 +278,147 @@ class UndirectedGraph:
 
     # ------------------------------------------------------------------ #
 
+    def enable_cache(self, maxsize=128) -> None:
+        """
+        Memoize dfs, bfs, has_cycle and count_connected_components until the graph changes
+        """
+        self.cache = QueryCache(maxsize)
+
+    def disable_cache(self) -> None:
+        """
+        Turn query caching off and drop the stored results
+        """
+        self.cache = None
+
+    def instrument(self, sink) -> None:
+        """
+        sink(stats) is called with a graph_stats.CallStats after every dfs, bfs, has_cycle
+        and count_connected_components call (e.g. a graph_stats.StatsCollector), None turns it off
+        """
+        self.probe = sink
+
+    def cache_info(self) -> dict:
+        """
+        Return hit/miss statistics of the query cache, None when caching is off
+        """
+        return self.cache.info() if self.cache is not None else None
+
+    def new_neighbors(self, items=()):
+        """
+        Return an empty neighbor container for the current storage mode
+        """
+        if self.storage == 'set':
+            return NeighborSet(items)
+        return list(items)
+
     def add_vertex(self, v: str) -> None:
         """
         Add new vertex to the graph
         """
-        self.adj_list[v] = []
-        
+        self.version += 1
+        self.thaw()
+        if v not in self.adj_list:
+            self.adj_list[v] = self.new_neighbors()
+            if not self.components_stale:
+                self.components.add(self.component_key(v))
+
     def add_edge(self, u: str, v: str) -> None:
         """
         Add edge to the graph
         """
+        self.version += 1
+        self.thaw()
         if u == v:
             return
         if u not in self.adj_list:
-            self.adj_list[u] = [v]
+            self.adj_list[u] = self.new_neighbors()
         if v not in self.adj_list:
-            self.adj_list[v] = [u]
+            self.adj_list[v] = self.new_neighbors()
         if u not in self.adj_list[v]:
-            self.adj_list[v].append(u)
+            self.writable_neighbors(v).append(u)
         if v not in self.adj_list[u]:
-            self.adj_list[u].append(v)
+            self.writable_neighbors(u).append(v)
+        if not self.components_stale:
+            u, v = self.component_key(u), self.component_key(v)
+            self.components.add(u)
+            self.components.add(v)
+            self.components.union(u, v)
+
+
+    def insert_edges(self, edges) -> None:
+        """
+        Add (u, v) pairs in one pass, loops and duplicate edges are dropped
+        Vertices and neighbors end up in the same order repeated add_edge calls give
+        """
+        self.version += 1
+        self.thaw()
+        new = {}    # new neighbors per vertex, dicts keep first seen order and drop duplicates
+        for u, v in edges:
+            if u == v:
+                continue
+            new.setdefault(u, {})[v] = None
+            new.setdefault(v, {})[u] = None
+        for vert in new:
+            if vert not in self.adj_list:
+                self.adj_list[vert] = self.new_neighbors()  # create every vertex first, in order
+        for vert, neighbors in new.items():
+            if self.storage == 'set':
+                self.writable_neighbors(vert).update(neighbors)
+            else:
+                existing = set(self.adj_list[vert])
+                self.writable_neighbors(vert).extend(n for n in neighbors if n not in existing)
+        if not self.components_stale:
+            key = self.adj_list.ids if self.storage == 'interned' else None
+            for vert, neighbors in new.items():
+                if key is not None:     # union ids, each name is looked up once per pair
+                    vert, neighbors = key[vert], [key[n] for n in neighbors]
+                self.components.add(vert)
+                for n in neighbors:
+                    self.components.add(n)
+                    self.components.union(vert, n)
+
+
+    def ingest(self, source, chunk_size=100000, progress=None, delimiter=None, header=False) -> int:
+        """
+        Stream edges into the graph chunk by chunk, source is a path to an edge list
+        ("u v" per line) or csv file, an open file or an iterable of (u, v) pairs
+        progress(edges_read) is called after every chunk, returns the number of edges read
+        """
+        total = 0
+        for chunk in edge_chunks(source, lambda fields: (fields[0], fields[1]), chunk_size, delimiter, header):
+            self.insert_edges(chunk)
+            total += len(chunk)
+            if progress is not None:
+                progress(total)
+        return total
 
 
     def remove_edge(self, v: str, u: str) -> None:
         """
         Remove edge from the graph
         """
+        self.version += 1
+        self.thaw()
         if v not in self.adj_list or u not in self.adj_list:
             return
         if v in self.adj_list[u]:
-            self.adj_list[u].remove(v)
-        if u in self.adj_list[v]:
-            self.adj_list[v].remove(u)
+            self.writable_neighbors(u).remove(v)
+            self.writable_neighbors(v).remove(u)
+            self.components_stale = True    # the edge may have split a component
 
     def remove_vertex(self, v: str) -> None:
         """
         Remove vertex and all connected edges
         """
+        self.version += 1
+        self.thaw()
         if v not in self.adj_list:
             return
-        for vertex in self.adj_list:
-            if v in self.adj_list[vertex]:
-                self.adj_list[vertex].remove(v)
+        for vertex in self.adj_list[v]:     # edges are stored both ways, so only neighbors point back to v
+            self.writable_neighbors(vertex).remove(v)
         del self.adj_list[v]
+        self.shared_rows.discard(v)
+        self.components_stale = True
         
 
     def get_vertices(self) -> []:
@@ -100,13 +436,116 @@ class UndirectedGraph:
         Return list of edges in the graph (any order)
         """
         edges = []
+        done = set()        # vertices whose edges have already been listed
         for vert in self.adj_list:
             for edge in self.adj_list[vert]:
-                if (edge, vert) not in edges:
+                if edge not in done:
                     edges.append((vert, edge))
+            done.add(vert)
         return edges
         
 
+    def to_csr(self):
+        """
+        Return the graph in compressed sparse row form as (names, offsets, targets),
+        vertex i is names[i] and its neighbors are targets[offsets[i]:offsets[i + 1]]
+        """
+        if self.storage == 'csr':
+            return self.adj_list.names, self.adj_list.offsets, self.adj_list.targets
+        names = list(self.adj_list)
+        ids = {name: i for i, name in enumerate(names)}
+        offsets = array('q', [0])
+        targets = array('q')
+        for vert in names:
+            targets.extend(ids[n] for n in self.adj_list[vert])
+            offsets.append(len(targets))
+        return names, offsets, targets
+
+
+    def thaw(self) -> None:
+        """
+        Switch a read only csr graph to set storage so it can be changed
+        Raise TypeError for snapshots and frozen copies, which stay read only
+        """
+        if self.frozen:
+            raise TypeError('graph is a read only snapshot, change the graph it was taken from')
+        if self.storage != 'csr':
+            return
+        csr = self.adj_list
+        self.storage = 'set'
+        self.adj_list = {v: self.new_neighbors(csr[v]) for v in csr}
+
+
+    def writable_neighbors(self, v: str):
+        """
+        Return the neighbors of v for writing, copying them first if a snapshot still shares them
+        """
+        if v in self.shared_rows:
+            self.shared_rows.discard(v)
+            self.adj_list[v] = self.new_neighbors(self.adj_list[v])
+        return self.adj_list[v]
+
+
+    def snapshot(self):
+        """
+        Return a read only copy of the graph as it is now, made in O(V): neighbor lists
+        are shared with the snapshot and this graph copies one before changing it
+        Queries on the snapshot can run in other threads while this graph keeps changing,
+        but snapshot() itself has to be called by the thread that changes the graph
+        """
+        if self.storage == 'interned':
+            return self.freeze()    # interned ids live in shared arrays, copy them compactly
+        graph = type(self)()
+        graph.storage = self.storage
+        graph.version = self.version
+        if self.storage == 'csr':
+            graph.adj_list = self.adj_list      # csr arrays are never written
+        else:
+            graph.adj_list = dict(self.adj_list)
+            self.shared_rows = set(self.adj_list)
+        graph.components_stale = True   # the snapshot builds its own components when asked
+        graph.frozen = True
+        return graph
+
+
+    def freeze(self):
+        """
+        Return a read only copy of the graph in compact csr form, made in O(V+E)
+        Shares nothing with this graph, for readers that keep a version for long
+        """
+        graph = type(self)()
+        graph.storage = 'csr'
+        graph.version = self.version
+        graph.adj_list = CSRAdjacency(*self.to_csr())
+        graph.components_stale = True
+        graph.frozen = True
+        return graph
+
+
+    def save(self, path) -> None:
+        """
+        Write the graph to path in the compact binary format of graph_file.py
+        """
+        names, offsets, targets = self.to_csr()
+        save_csr(path, UNDIRECTED, offsets, targets, names=names)
+
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Read a graph written by save(), with mmap=True the file is mapped read only
+        and shared with other processes instead of being copied into memory
+        """
+        sections = load_csr(path, UNDIRECTED, mmap)
+        name_offsets, blob = sections['name_offsets'], sections['names']
+        names = [str(blob[name_offsets[i]:name_offsets[i + 1]], 'utf-8') for i in range(sections['v_count'])]
+        graph = cls()
+        graph.storage = 'csr'
+        graph.adj_list = CSRAdjacency(names, sections['offsets'], sections['targets'])
+        graph.components_stale = True   # components are built on the first query
+        return graph
+
+
     def is_valid_path(self, path: []) -> bool:
         """
         Return true if provided path is valid, False otherwise
@@ -116,118 +555,405 @@ class UndirectedGraph:
                 return False
             else:
                 return True
-        edges = self.get_edges()        # create list of edges
         for vert in range(len(path) - 1):   # for each vertex in path, check if there is a connecting edge
-            if vert is not path[len(path) - 1]:
-                if (path[vert], path[vert + 1]) not in edges and (path[vert + 1], path[vert]) not in edges:
-                    return False
+            if path[vert] not in self.adj_list or path[vert + 1] not in self.adj_list[path[vert]]:
+                return False
         return True
 
-    def dfs_helper(self, v_end, output, stack):
-        """recursive helper for dfs"""
-        if len(stack) > 0:      # if the stack is empty, return the output
-            v = stack.pop()
-            if v not in output:
-                output.append(v)    # add element popped from the stack to output
-                if v == v_end:
-                    return output
-                temp = []       # crete a temporary list to be sorted and added to the stack
-                for element in self.adj_list[v]:
-                    temp.append(element)
-                temp.sort(reverse=True)  # add the vertices to the stack so they are processed in lexicographical order
-                for vertex in temp:
-                    stack.append(vertex)
-            return self.dfs_helper(v_end, output, stack)
-        return output
 
+    def validate_paths(self, paths, weights=False, first_bad=False):
+        """
+        Check many paths in one pass, return a boolean array of is_valid_path() results
+        weights=True adds each path's length in edges (inf for invalid paths) and first_bad=True
+        the index of its first hop that is not an edge (-1 for valid paths), as (valid, ...)
+        A one vertex path that names a missing vertex fails at hop 0
+        Hops are looked up in neighbor sets built once per graph version (lists without numpy)
+        """
+        if self.storage == 'set':
+            index = self.adj_list       # NeighborSets already answer "in" in O(1)
+        else:
+            if self.edge_index is None or self.edge_index[0] != self.version:
+                self.edge_index = [self.version, {v: set(self.adj_list[v]) for v in self.adj_list}]
+            index = self.edge_index[1]
+        valid, totals, bad_hops = [], [], []
+        for path in paths:
+            bad = -1
+            if len(path) == 1 and path[0] not in index:
+                bad = 0
+            for i in range(len(path) - 1):
+                if path[i] not in index or path[i + 1] not in index[path[i]]:
+                    bad = i
+                    break
+            valid.append(bad == -1)
+            totals.append(max(len(path) - 1, 0) if bad == -1 else float('inf'))
+            bad_hops.append(bad)
+        if np is not None:
+            # totals are float64 like DirectedGraph's, also when every path is valid
+            valid, totals, bad_hops = (np.array(valid, dtype=bool), np.array(totals, dtype=np.float64),
+                                       np.array(bad_hops, dtype=np.int64))
+        result = [valid]
+        if weights:
+            result.append(totals)
+        if first_bad:
+            result.append(bad_hops)
+        return result[0] if len(result) == 1 else tuple(result)
 
+    def dfs_helper(self, v_end, stack):
+        """iterative helper for dfs, yields vertices as they are visited"""
+        sink = self.probe
+        stats = begin(sink, 'dfs')
+        if stats is not None:
+            stats.pushes = len(stack)
+        visited = set()
+        try:
+            while len(stack) > 0:       # stop once the stack is empty
+                v = stack.pop()
+                if stats is not None:
+                    stats.pops += 1
+                if v not in visited:
+                    visited.add(v)
+                    yield v     # element popped from the stack is the next one visited
+                    if v == v_end:
+                        return
+                    neighbors = self.adj_list[v]
+                    temp = [element for element in neighbors if element not in visited]
+                    temp.sort(reverse=True)  # add the vertices to the stack so they are processed in lexicographical order
+                    stack.extend(temp)
+                    if stats is not None:
+                        stats.scan(len(neighbors), len(temp), len(stack))
+        finally:
+            if stats is not None:
+                stats.vertices_visited = len(visited)
+                finish(sink, stats)
+
+
+    def interned_dfs_helper(self, v_end, stack):
+        """dfs_helper for interned storage, works on ids and sorts neighbors by name rank"""
+        adjacency = self.adj_list
+        names, neighbors, rank = adjacency.names, adjacency.neighbors, adjacency.ranks()
+        end = adjacency.ids.get(v_end, -1)
+        sink = self.probe
+        stats = begin(sink, 'dfs')
+        if stats is not None:
+            stats.pushes = len(stack)
+        visited = bytearray(len(names))
+        try:
+            while len(stack) > 0:
+                v = stack.pop()
+                if stats is not None:
+                    stats.pops += 1
+                if not visited[v]:
+                    visited[v] = 1
+                    yield names[v]      # names are only looked up for the output
+                    if stats is not None:
+                        stats.vertices_visited += 1
+                    if v == end:
+                        return
+                    temp = [element for element in neighbors[v] if not visited[element]]
+                    temp.sort(key=rank.__getitem__, reverse=True)
+                    stack.extend(temp)
+                    if stats is not None:
+                        stats.scan(len(neighbors[v]), len(temp), len(stack))
+        finally:
+            finish(sink, stats)
+
+
+    def iter_dfs(self, v_start, v_end=None):
+        """
+        Generator version of dfs, yields vertices lazily in the same order
+        """
+        if v_start not in self.adj_list:
+            return
+        if self.storage == 'interned':
+            yield from self.interned_dfs_helper(v_end, [self.adj_list.ids[v_start]])
+            return
+        yield from self.dfs_helper(v_end, [v_start])
+
+
+    @cached
     def dfs(self, v_start, v_end=None) -> []:
         """
         Return list of vertices visited during DFS search
         Vertices are picked in alphabetical order
         """
-        output = []
-        stack = [v_start]   # add start to the stack
+        return list(self.iter_dfs(v_start, v_end))
+
+
+    def bfs_helper(self, v_end, queue):
+        """iterative helper for bfs, yields vertices as they are visited"""
+        sink = self.probe
+        stats = begin(sink, 'bfs')
+        if stats is not None:
+            stats.pushes = len(queue)
+        visited = set()
+        try:
+            while len(queue) > 0:       # stop once the queue is empty
+                v = queue.popleft()     # dequeue
+                if stats is not None:
+                    stats.pops += 1
+                if v not in visited:
+                    visited.add(v)
+                    yield v
+                    if v == v_end:
+                        return
+                    neighbors = self.adj_list[v]
+                    temp = [element for element in neighbors if element not in visited]
+                    temp.sort()
+                    queue.extend(temp)      # add all vertices to the queue in lexicographical order
+                    if stats is not None:
+                        stats.scan(len(neighbors), len(temp), len(queue))
+        finally:
+            if stats is not None:
+                stats.vertices_visited = len(visited)
+                finish(sink, stats)
+
+
+    def interned_bfs_helper(self, v_end, queue):
+        """bfs_helper for interned storage, works on ids and sorts neighbors by name rank"""
+        adjacency = self.adj_list
+        names, neighbors, rank = adjacency.names, adjacency.neighbors, adjacency.ranks()
+        end = adjacency.ids.get(v_end, -1)
+        sink = self.probe
+        stats = begin(sink, 'bfs')
+        if stats is not None:
+            stats.pushes = len(queue)
+        visited = bytearray(len(names))
+        try:
+            while len(queue) > 0:
+                v = queue.popleft()
+                if stats is not None:
+                    stats.pops += 1
+                if not visited[v]:
+                    visited[v] = 1
+                    yield names[v]
+                    if stats is not None:
+                        stats.vertices_visited += 1
+                    if v == end:
+                        return
+                    temp = [element for element in neighbors[v] if not visited[element]]
+                    temp.sort(key=rank.__getitem__)
+                    queue.extend(temp)
+                    if stats is not None:
+                        stats.scan(len(neighbors[v]), len(temp), len(queue))
+        finally:
+            finish(sink, stats)
+
+
+    def iter_bfs(self, v_start, v_end=None):
+        """
+        Generator version of bfs, yields vertices lazily in the same order
+        """
         if v_start not in self.adj_list:
-            return output
-        return self.dfs_helper(v_end, output, stack)    # call recursive helper
-
-
-    def bfs_helper(self, v_end, visited, queue):
-        """recursive helper for bfs"""
-        if len(queue) > 0:      # return visited if the queue is empty
-            v = queue.pop(0)    # dequeue
-            if v not in visited:
-                visited.append(v)   # add v to visited if v is not already in there
-                if v is v_end:
-                    return visited
-                temp = []       # create temp list to help add to queue in lexicographical order
-                for element in self.adj_list[v]:
-                    temp.append(element)
-                temp.sort()
-                for vertex in temp:
-                    queue.append(vertex)    # add all vertices to the queue in lexicographical order
-            return self.bfs_helper(v_end, visited, queue)
-        return visited
-        
+            return
+        if self.storage == 'interned':
+            yield from self.interned_bfs_helper(v_end, deque([self.adj_list.ids[v_start]]))
+            return
+        yield from self.bfs_helper(v_end, deque([v_start]))
+
 
+    @cached
     def bfs(self, v_start, v_end=None) -> []:
         """
         Return list of vertices visited during BFS search
         Vertices are picked in alphabetical order
         """
-        visited = []
-        queue = [v_start]
-        if v_start not in self.adj_list:
-            return visited
-        return self.bfs_helper(v_end, visited, queue)   # call recursive helper
-        
-        
+        return list(self.iter_bfs(v_start, v_end))
+
+
+    def bfs_levels(self, v_start: str, direction='auto'):
+        """
+        Breadth first search one whole level at a time over a csr copy of the graph
+        Return (levels, parents) dicts holding the reached vertices only: levels[v] is the
+        number of edges from v_start to v, parents[v] the neighbor before v on such a path
+        (parents[v_start] is v_start), ties go to the neighbor listed first in get_vertices()
+        With numpy levels are expanded top-down or bottom-up (see level_bfs.py)
+        """
+        if self.level_csr is None or self.level_csr[0] != self.version:
+            names, offsets, targets = self.to_csr()
+            if np is not None:
+                offsets, targets = np.asarray(offsets, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+            self.level_csr = [self.version, names, {name: i for i, name in enumerate(names)}, offsets, targets]
+        _, names, ids, offsets, targets = self.level_csr
+        if v_start not in ids:
+            return {}, {}
+        start = ids[v_start]
+        if np is None:
+            levels, parents = level_bfs_lists(offsets, targets, len(names), start, self.probe)
+            reached = [i for i in range(len(names)) if levels[i] != -1]
+            return ({names[i]: levels[i] for i in reached},
+                    {names[i]: names[parents[i]] for i in reached})
+        # edges are stored both ways, so the csr arrays are their own reverse
+        levels, parents = level_bfs(offsets, targets, len(names), start, (offsets, targets), direction, self.probe)
+        reached = np.flatnonzero(levels >= 0)
+        reached_names = [names[i] for i in reached.tolist()]
+        return (dict(zip(reached_names, levels[reached].tolist())),
+                dict(zip(reached_names, [names[i] for i in parents[reached].tolist()])))
+
+
+    def shortest_path(self, u: str, v: str) -> []:
+        """
+        Return the vertices on a shortest (fewest hops) path from u to v, [] if there is none
+        Searches from both ends at once, expanding the smaller frontier one level at a time
+        """
+        if u not in self.adj_list or v not in self.adj_list:
+            return []
+        if u == v:
+            return [u]
+        sink = self.probe
+        stats = begin(sink, 'shortest_path')
+        parents = ({u: None}, {v: None})    # forward and backward search trees
+        depth = ({u: 0}, {v: 0})
+        frontiers = ([u], [v])
+        meeting = None
+        while meeting is None and len(frontiers[0]) > 0 and len(frontiers[1]) > 0:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            mine, other = parents[side], parents[1 - side]
+            best = None
+            next_frontier = []
+            for x in frontiers[side]:
+                neighbors = self.adj_list[x]
+                for w in neighbors:
+                    if w in mine:
+                        continue
+                    mine[w] = x
+                    depth[side][w] = depth[side][x] + 1
+                    next_frontier.append(w)
+                    if w in other and (best is None or depth[1 - side][w] < depth[1 - side][best]):
+                        best = w        # finish the level and keep the meeting closest to the other end
+                if stats is not None:
+                    stats.vertices_visited += 1
+                    stats.scan(len(neighbors), 0, len(next_frontier))
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+            meeting = best
+        finish(sink, stats)
+        if meeting is None:
+            return []
+        path = []
+        w = meeting
+        while w is not None:        # walk back to u
+            path.append(w)
+            w = parents[0][w]
+        path.reverse()
+        w = parents[1][meeting]
+        while w is not None:        # and forward to v
+            path.append(w)
+            w = parents[1][w]
+        return path
+
+
+    def distance(self, u: str, v: str):
+        """
+        Return the number of edges on a shortest path from u to v, inf if there is none
+        """
+        path = self.shortest_path(u, v)
+        return len(path) - 1 if len(path) > 0 else float('inf')
 
+
+    def component_key(self, v: str):
+        """
+        Return the union-find key of v, its id for interned storage and its name otherwise
+        """
+        return self.adj_list.ids[v] if self.storage == 'interned' else v
+
+
+    def rebuild_components(self, stats=None) -> None:
+        """
+        Rebuild the union-find from scratch after vertices or edges were removed
+        """
+        if self.storage == 'interned':      # straight over the id arrays
+            neighbors = self.adj_list.neighbors
+            self.components = IdUnionFind(len(neighbors))
+            for u in self.adj_list.ids.values():
+                self.components.add(u)
+            for u in self.adj_list.ids.values():
+                for v in neighbors[u]:
+                    self.components.union(u, v)
+                if stats is not None:
+                    stats.vertices_visited += 1
+                    stats.scan(len(neighbors[u]), 0, 0)
+            self.components_stale = False
+            return
+        self.components = UnionFind(self.adj_list)
+        for u in self.adj_list:
+            neighbors = self.adj_list[u]
+            for v in neighbors:
+                self.components.union(u, v)
+            if stats is not None:
+                stats.vertices_visited += 1
+                stats.scan(len(neighbors), 0, 0)
+        self.components_stale = False
+
+
+    @cached
     def count_connected_components(self):
         """
         Return number of connected componets in the graph
         """
-        tracker = {}
-        for v in self.adj_list:
-            tracker[v] = False  # create a tracker to track visited vertices, set all values to false
-        components = 0
-        for v in tracker:
-            if tracker[v] is False:    # if vertex has not been visited
-                output = self.dfs(v)    # call dfs to get all connected vertices to v
-                for v in output:
-                    tracker[v] = True   # set to true to indicate vertex has been visited
-                components += 1     # increment components count
-        return components
-
-
-    def cycle_helper(self, v, tracker, parent=None):
-        """recursive helper for has cycle method"""
-        tracker[v] = True       # set true for the node we are visiting
-        for vertices in self.adj_list[v]:   # for all vertices adjacent to v
-            if tracker[vertices] is False:  # if vertex has not been visited
-                if self.cycle_helper(vertices, tracker, v) is True:    # if cycle helper for adj vertex is true
-                    return True    # retrun true
-            elif parent != vertices:
+        sink = self.probe
+        stats = begin(sink, 'count_connected_components')
+        if self.components_stale:
+            self.rebuild_components(stats)
+        finish(sink, stats)
+        return self.components.count
+
+
+    def same_component(self, u: str, v: str) -> bool:
+        """
+        Return True if u and v are in the same connected component
+        """
+        if u not in self.adj_list or v not in self.adj_list:
+            return False
+        if self.components_stale:
+            self.rebuild_components()
+        u, v = self.component_key(u), self.component_key(v)
+        return self.components.find(u) == self.components.find(v)
+
+
+    def cycle_helper(self, neighbors, vertices, visited, stats=None) -> bool:
+        """
+        iterative helper for has cycle method, a component has a cycle exactly when it has
+        at least as many edges as vertices, so one pass over the adjacency is enough
+        neighbors[v] lists the neighbors of v, visited[v] is 0 for every vertex to start
+        """
+        for start in vertices:
+            if visited[start]:
+                continue
+            visited[start] = 1
+            stack = [start]
+            size = degrees = 0
+            while len(stack) > 0:
+                v = stack.pop()
+                size += 1
+                degrees += len(neighbors[v])
+                for w in neighbors[v]:
+                    if not visited[w]:
+                        visited[w] = 1
+                        stack.append(w)
+                if stats is not None:
+                    stats.vertices_visited += 1
+                    stats.pops += 1
+                    stats.scan(len(neighbors[v]), 1, len(stack))  # every vertex is pushed exactly once
+            if degrees // 2 >= size:    # every edge is counted from both ends
                 return True
         return False
 
 
-
+    @cached
     def has_cycle(self):
         """
         Return True if graph contains a cycle, False otherwise
         """
         if len(self.adj_list) < 3:
             return False    # return false if graph is too small for a cycle
-        tracker = {}
-        for v in self.adj_list:
-            tracker[v] = False  # create a visited tracker
-        for v in self.adj_list:
-            if tracker[v] is False:
-                if self.cycle_helper(v, tracker) is True:   # call recursive helper
-                    return True
-        return False
+        sink = self.probe
+        stats = begin(sink, 'has_cycle')
+        try:
+            if self.storage == 'interned':     # same search on the id arrays
+                neighbors = self.adj_list.neighbors
+                return self.cycle_helper(neighbors, self.adj_list.ids.values(), bytearray(len(neighbors)), stats)
+            return self.cycle_helper(self.adj_list, self.adj_list, dict.fromkeys(self.adj_list, 0), stats)
+        finally:
+            finish(sink, stats)
 
 
    
@@ -324,3 +1050,67 @@ if __name__ == '__main__':
         u, v = edge
         g.add_edge(u, v) if command == 'add' else g.remove_edge(u, v)
         print('{:<10}'.format(case), g.has_cycle())
+
+
+    print("\nPDF - storage='interned' example 1")
+    print("----------------------------------")
+    edges = ['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG']
+    g = UndirectedGraph(edges, storage='interned')
+    print(g)
+    print(g.dfs('A'), g.bfs('A'), g.count_connected_components(), g.has_cycle())
+    g.remove_vertex('C')        # its id is reused by the next new vertex
+    g.add_edge('Z', 'A')
+    print(g.get_vertices(), g.adj_list.ids['Z'], g.count_connected_components())
+
+
+    print("\nPDF - storage='set' example 1")
+    print("-----------------------------")
+    g = UndirectedGraph(['AB', 'AC', 'BC', 'BD', 'CD', 'CE', 'DE'], storage='set')
+    g.add_edge('A', 'B')        # already there, stays a single edge
+    g.remove_edge('C', 'D')
+    print(g)
+    print(g.get_edges() == UndirectedGraph(['AB', 'AC', 'BC', 'BD', 'CE', 'DE']).get_edges(),
+          g.is_valid_path(list('ABDEC')), g.is_valid_path(list('ACDE')))
+
+
+    print("\nPDF - method same_component() example 1")
+    print("---------------------------------------")
+    edges = ['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG']
+    g = UndirectedGraph(edges)
+    test_cases = ['AH', 'AQ', 'QF', 'HZ']
+    print([g.same_component(u, v) for u, v in test_cases])
+    g.add_edge('H', 'Q')        # merges the two components in place
+    print([g.same_component(u, v) for u, v in test_cases])
+    g.remove_edge('B', 'H')     # may split one, rebuilt on the next query
+    print([g.same_component(u, v) for u, v in test_cases])
+
+
+    print("\nPDF - method shortest_path() / distance() example 1")
+    print("---------------------------------------------------")
+    edges = ['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG']
+    g = UndirectedGraph(edges)
+    for u, v in ['AH', 'HA', 'DA', 'AA', 'AQ', 'AZ']:
+        print(f'{u}-{v} {g.shortest_path(u, v)} {g.distance(u, v)}')
+
+
+    print("\nPDF - method save() / load() example 1")
+    print("--------------------------------------")
+    import os
+    import tempfile
+    edges = ['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG']
+    g = UndirectedGraph(edges)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'graph.bin')
+        g.save(path)
+        loaded = UndirectedGraph.load(path, mmap=False)
+    print(loaded.storage, loaded.get_edges() == g.get_edges(), loaded.bfs('A') == g.bfs('A'))
+    loaded.add_edge('H', 'Q')       # switches to set storage first
+    print(loaded.storage, loaded.count_connected_components(), g.count_connected_components())
+
+
+    print("\nPDF - method validate_paths() example 1")
+    print("---------------------------------------")
+    g = UndirectedGraph(['AB', 'AC', 'BC', 'BD', 'CD', 'CE', 'DE'])
+    test_cases = ['ABC', 'ADE', 'ECABDCBE', 'ACDECB', '', 'D', 'Z']
+    print(g.validate_paths([list(path) for path in test_cases], weights=True, first_bad=True))
+    print(g.validate_paths([['A'], ['B']], weights=True))